@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
+import numpy as np
 import pandas as pd
+from triple_barrier import label_matrix, FirstPassageIndex
 
 class Strategy(ABC):
     """
@@ -24,3 +26,26 @@ class Strategy(ABC):
                 - data_y (pd.Series):    Labels binaires d'apprentissage (1 = Profit, 0 = Perte/SL)
         """
         pass
+
+    def generate_label_matrix(self, ohlcv: pd.DataFrame, configs: list,
+                              index: FirstPassageIndex = None) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        Comme generate_dataset, mais labellise les mêmes trades pour plusieurs
+        configurations de barrières, sans recalculer trendlines ni features.
+
+        Args:
+            ohlcv (pd.DataFrame): Données de marché
+            configs (list):       [(tp_mult, sl_mult, hold_period), ...]
+            index (FirstPassageIndex): Index des premiers passages de log(close),
+                                  à réutiliser entre plusieurs appels (optionnel)
+
+        Returns:
+            tuple:
+                - trades (pd.DataFrame):  Trades de la configuration de la stratégie
+                - data_x (pd.DataFrame):  Features (une ligne par trade)
+                - returns (pd.DataFrame): Rendement log de chaque trade, une colonne par configuration
+                - labels (pd.DataFrame):  Labels binaires, une colonne par configuration
+        """
+        trades, data_x, _ = self.generate_dataset(ohlcv)
+        returns, labels = label_matrix(np.log(ohlcv['close'].to_numpy()), trades, configs, index)
+        return trades, data_x, returns, labels
@@ -0,0 +1,91 @@
+"""
+benchmark_meta_models.py
+------------------------
+Coût par fold de chaque backend de méta-modèle, sur les vraies matrices
+de features des trades :
+  - fit         : temps d'entraînement sur tous les trades
+  - batch       : débit de predict_proba sur toute la matrice (trades/s)
+  - single row  : latence médiane d'un predict_proba sur une seule ligne (µs)
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from meta_model import BACKENDS, make_meta_model
+
+
+def benchmark_backend(backend: str, X: np.array, y: np.array,
+                      n_repeat: int = 3, n_single: int = 200) -> dict:
+    fit_times = []
+    for _ in range(n_repeat):
+        model = make_meta_model(backend)
+        t = time.perf_counter()
+        model.fit(X, y)
+        fit_times.append(time.perf_counter() - t)
+
+    batch_times = []
+    for _ in range(n_repeat):
+        t = time.perf_counter()
+        model.predict_proba(X)
+        batch_times.append(time.perf_counter() - t)
+
+    rows = X[np.arange(n_single) % len(X)]
+    single_times = np.empty(n_single)
+    for k in range(n_single):
+        row = rows[k:k + 1]
+        t = time.perf_counter()
+        model.predict_proba(row)
+        single_times[k] = time.perf_counter() - t
+
+    return {
+        'backend'   : backend,
+        'fit_s'     : min(fit_times),
+        'batch_tps' : len(X) / min(batch_times),
+        'single_us' : np.median(single_times) * 1e6,
+        'n'         : len(X),
+    }
+
+
+def run_benchmark(data_x: pd.DataFrame, data_y: pd.Series, backends=None) -> pd.DataFrame:
+    X = data_x.to_numpy()
+    y = data_y.to_numpy()
+    results = []
+    for backend in backends or BACKENDS:
+        try:
+            results.append(benchmark_backend(backend, X, y))
+        except ImportError as e:
+            print(f"  ⚠️  {backend} indisponible : {e}")
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    from walkforward_multi import load_pair
+    from strategies.trendline_strategy import TrendlineBreakoutStrategy
+
+    strategy = TrendlineBreakoutStrategy(lookback=72, hold_period=24)
+    all_x, all_y = [], []
+    for sym in ['ETH', 'SOL']:
+        path = f"data/{sym}USDT3600.csv"
+        if os.path.exists(path):
+            _, data_x, data_y = strategy.generate_dataset(load_pair(path))
+            all_x.append(data_x)
+            all_y.append(data_y)
+
+    if not all_x:
+        print("❌ Aucune donnée disponible.")
+        exit()
+
+    data_x = pd.concat(all_x)
+    data_y = pd.concat(all_y)
+    df = run_benchmark(data_x, data_y)
+
+    print("\n" + "=" * 62)
+    print(f"  BENCHMARK MÉTA-MODÈLES — {len(data_x)} trades, {data_x.shape[1]} features")
+    print("=" * 62)
+    print(f"  {'Backend':<10} {'Fit (s)':>9} {'Batch (trades/s)':>18} {'1 ligne (µs)':>14}")
+    print("-" * 62)
+    for _, row in df.iterrows():
+        print(f"  {row.backend:<10} {row.fit_s:>9.3f} "
+              f"{row.batch_tps:>18,.0f} {row.single_us:>14.1f}")
+    print("=" * 62)
@@ -0,0 +1,134 @@
+"""
+meta_model.py
+-------------
+Interface commune des méta-modèles du walk-forward.
+
+  - XGBoostMetaModel   : configuration historique (XGBClassifier 500 arbres)
+  - LightGBMMetaModel  : LGBMClassifier, paramètres équivalents
+  - HistGBMetaModel    : sklearn HistGradientBoostingClassifier
+
+Tous exposent l'API sklearn utilisée par les scripts (fit, predict_proba
+→ (n, 2), feature_importances_) ; XGBoost et LightGBM ajoutent continue_fit
+pour le warm start (supports_warm_start).
+Le backend se choisit par son nom : make_meta_model('lightgbm', ...).
+"""
+
+from abc import ABC, abstractmethod
+import numpy as np
+
+
+class MetaModel(ABC):
+    name = None
+    default_params = {}
+    supports_warm_start = False
+
+    def __init__(self, n_jobs: int = None, **params):
+        self.n_jobs = n_jobs
+        self.params = {**self.default_params, **params}
+        self.model  = None
+
+    @abstractmethod
+    def _build(self, params: dict):
+        """Estimateur sklearn non entraîné."""
+
+    def fit(self, X: np.array, y: np.array):
+        self.model = self._build(self.params)
+        self.model.fit(X, y)
+        return self
+
+    def predict_proba(self, X: np.array) -> np.array:
+        return self.model.predict_proba(X)
+
+    @property
+    def feature_importances_(self):
+        return self.model.feature_importances_
+
+    def continue_fit(self, X: np.array, y: np.array, add_rounds: int):
+        """
+        Nouveau modèle = ce modèle + add_rounds itérations de boosting
+        entraînées sur (X, y). Ce modèle n'est pas modifié.
+        Backends avec supports_warm_start uniquement (cf. check_backend).
+        """
+        raise NotImplementedError(f"{self.name} does not support warm start")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.params})"
+
+
+class XGBoostMetaModel(MetaModel):
+    name = 'xgboost'
+    supports_warm_start = True
+    default_params = dict(
+        n_estimators=500, max_depth=3,
+        learning_rate=0.05, subsample=0.8,
+        colsample_bytree=0.8, eval_metric='logloss',
+        random_state=42
+    )
+
+    def _build(self, params):
+        import xgboost as xgb
+        return xgb.XGBClassifier(**params, n_jobs=self.n_jobs)
+
+    def continue_fit(self, X, y, add_rounds):
+        warm = XGBoostMetaModel(self.n_jobs, **{**self.params, 'n_estimators': add_rounds})
+        warm.model = warm._build(warm.params)
+        warm.model.fit(X, y, xgb_model=self.model.get_booster())
+        return warm
+
+
+class LightGBMMetaModel(MetaModel):
+    name = 'lightgbm'
+    supports_warm_start = True
+    default_params = dict(
+        n_estimators=500, max_depth=3, num_leaves=8,
+        learning_rate=0.05, subsample=0.8, subsample_freq=1,
+        colsample_bytree=0.8, random_state=42, verbose=-1
+    )
+
+    def _build(self, params):
+        import lightgbm as lgb
+        n_jobs = -1 if self.n_jobs is None else self.n_jobs
+        return lgb.LGBMClassifier(**params, n_jobs=n_jobs)
+
+    def continue_fit(self, X, y, add_rounds):
+        warm = LightGBMMetaModel(self.n_jobs, **{**self.params, 'n_estimators': add_rounds})
+        warm.model = warm._build(warm.params)
+        warm.model.fit(X, y, init_model=self.model.booster_)
+        return warm
+
+
+class HistGBMetaModel(MetaModel):
+    # Pas de warm start : avec warm_start=True, sklearn recalcule les bins sur
+    # les nouvelles données alors que les arbres existants gardent leurs
+    # seuils de bins → prédictions de départ fausses
+    name = 'histgb'
+    default_params = dict(
+        max_iter=500, max_depth=3,
+        learning_rate=0.05, early_stopping=False,
+        random_state=42
+    )
+
+    def _build(self, params):
+        # Threads via OpenMP (OMP_NUM_THREADS), pas de n_jobs
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(**params)
+
+
+BACKENDS = {cls.name: cls for cls in (XGBoostMetaModel, LightGBMMetaModel, HistGBMetaModel)}
+
+
+def check_backend(backend: str, incremental: bool = False):
+    """ValueError si le backend est inconnu, ou sans warm start en mode incrémental."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown meta-model backend '{backend}' "
+                         f"(expected one of {', '.join(BACKENDS)})")
+    if incremental and not BACKENDS[backend].supports_warm_start:
+        warm = [name for name, cls in BACKENDS.items() if cls.supports_warm_start]
+        raise ValueError(f"Meta-model backend '{backend}' does not support incremental=True "
+                         f"(expected one of {', '.join(warm)})")
+
+
+def make_meta_model(backend: str = 'xgboost', n_jobs: int = None, **params) -> MetaModel:
+    """Méta-modèle non entraîné ; params surchargent les paramètres par défaut."""
+    check_backend(backend)
+    return BACKENDS[backend](n_jobs, **params)
@@ -4,80 +4,215 @@ optimize_params.py
 Teste différentes combinaisons de TP / SL / Hold Period / Lookback
 pour trouver la configuration qui maximise le win rate et le PF de base
 (SANS ML — on cherche d'abord un bon edge brut)
+
+run_grid_search_resumable : même grille (plus l'ATR lookback), par blocs
+de configurations dans un pool de processus ; chaque bloc terminé est ajouté
+au fichier de résultats → un run interrompu reprend là où il s'était arrêté.
 """
 
+import os
 import numpy as np
 import pandas as pd
 import pandas_ta as ta
 import matplotlib.pyplot as plt
-from trendline_automation import fit_trendlines_single
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from parallel_trendlines import fit_trendlines_multi_parallel, _resolve_n_jobs
+from trendline_cache import cached_fit_trendlines_rolling, DEFAULT_CACHE_DIR
+from results_store import data_fingerprint
+from triple_barrier import barrier_grid, FirstPassageIndex
 import itertools
 
+# Colonnes du fichier de résultats ; une combinaison = (lookback, atr_lookback, hold, tp, sl),
+# data = empreinte des données OHLCV (results_store.data_fingerprint)
+GRID_KEY     = ['lookback', 'atr_lookback', 'hold', 'tp', 'sl']
+GRID_COLUMNS = GRID_KEY + ['pf', 'wr', 'avg', 'n', 'data']
+
+
+def log_atr(data: pd.DataFrame, atr_lookback: int) -> np.array:
+    return ta.atr(np.log(data['high']), np.log(data['low']),
+                  np.log(data['close']), atr_lookback).to_numpy()
+
+
+def grid_records(close: np.array, atr: np.array, r_vals: np.array, atr_lookback: int,
+                 configs: list, index: FirstPassageIndex = None):
+    """
+    Statistiques sans ML de chaque configuration (tp, sl, hold) pour une
+    série de résistances : PF, win rate, rendement moyen et N des trades
+    clôturés (toutes les configurations, quel que soit N).
+    """
+    breakout = np.zeros(len(close), dtype=bool)
+    breakout[atr_lookback:] = close[atr_lookback:] > r_vals[atr_lookback:]
+
+    records = []
+    # Toutes les configurations en une passe : premiers passages TP / SL
+    # calculés une fois par niveau, puis une position à la fois par config
+    for (tp, sl, hp), taken in barrier_grid(close, breakout, atr, configs, index=index):
+        closed = ~np.isnan(taken['exit_i'])
+        r      = taken['exit_p'][closed] - close[taken['entry_i'][closed]]
+
+        wins  = r[r > 0].sum()
+        loses = np.abs(r[r < 0]).sum()
+        records.append({
+            'hold': hp, 'tp': tp, 'sl': sl,
+            'pf' : wins / loses if loses > 0 else 0,
+            'wr' : len(r[r > 0]) / len(r) if len(r) else np.nan,
+            'avg': r.mean() if len(r) else np.nan,
+            'n'  : len(r)
+        })
+    return records
+
 
-def run_fast_grid_search(data, lookbacks, hold_periods, tp_mults, sl_mults, atr_lookback=168):
+def run_fast_grid_search(data, lookbacks, hold_periods, tp_mults, sl_mults, atr_lookback=168,
+                         n_jobs=None):
     close = np.log(data['close'].to_numpy())
-    atr = ta.atr(np.log(data['high']), np.log(data['low']),
-                 np.log(data['close']), atr_lookback).to_numpy()
+    atr   = log_atr(data, atr_lookback)
 
     results = []
     total = len(lookbacks) * len(hold_periods) * len(tp_mults) * len(sl_mults)
     done  = 0
     print(f"Test de {total} combinaisons en cours avec pré-calcul (TRÈS RAPIDE)...")
 
-    for lb in lookbacks:
-        print(f"  > Pré-calcul Mathématique des Trendlines pour lookback={lb}...")
-        r_vals = np.full(len(close), np.nan)
-        for i in range(atr_lookback, len(close)):
-            window = close[i - lb: i]
-            _, r_coefs = fit_trendlines_single(window)
-            r_vals[i] = r_coefs[1] + lb * r_coefs[0]
-
-        for hp, tp, sl in itertools.product(hold_periods, tp_mults, sl_mults):
-            returns = []
-            in_trade = False
-            trade_tp = trade_sl = hp_i = None
-
-            for i in range(atr_lookback, len(close)):
-                r_val = r_vals[i]
-                
-                # Entrée
-                if not in_trade and close[i] > r_val:
-                    entry  = close[i]
-                    trade_tp = entry + atr[i] * tp
-                    trade_sl = entry - atr[i] * sl
-                    hp_i   = i + hp
-                    in_trade = True
-
-                # Sortie
-                if in_trade:
-                    if close[i] >= trade_tp:
-                        returns.append(close[i] - entry)
-                        in_trade = False
-                    elif close[i] <= trade_sl:
-                        returns.append(close[i] - entry)
-                        in_trade = False
-                    elif i >= hp_i:
-                        returns.append(close[i] - entry)
-                        in_trade = False
-
-            if len(returns) >= 20:
-                r = np.array(returns)
-                wins  = r[r > 0].sum()
-                loses = np.abs(r[r < 0]).sum()
-                pf    = wins / loses if loses > 0 else 0
-                wr    = len(r[r > 0]) / len(r)
-                avg   = r.mean()
-                results.append({
-                    'lookback': lb, 'hold': hp,
-                    'tp': tp, 'sl': sl,
-                    'pf': pf, 'wr': wr, 'avg': avg, 'n': len(r)
-                })
-            
+    print(f"  > Pré-calcul Mathématique des Trendlines pour lookbacks={list(lookbacks)}...")
+    _, r_vals_all = fit_trendlines_multi_parallel(close, lookbacks, n_jobs)
+
+    # Chemins max / min courants de close : communs à tous les lookbacks
+    index = FirstPassageIndex(close, max(hold_periods))
+
+    for lb, r_vals in zip(lookbacks, r_vals_all):
+        configs = [(tp, sl, hp) for hp, tp, sl
+                   in itertools.product(hold_periods, tp_mults, sl_mults)]
+        for rec in grid_records(close, atr, r_vals, atr_lookback, configs, index):
+            if rec['n'] >= 20:
+                results.append({'lookback': lb, **rec})
             done += 1
 
     return results
 
 
+# ── Runner parallèle et reprenable ──────────────────────────────────────────
+# État des workers (attaché une fois par processus) : OHLCV, résistances
+# par lookback, index des premiers passages, ATR déjà calculés
+_data = _r_vals = _index = None
+_atr  = {}
+
+
+def _attach_grid(data: pd.DataFrame, r_vals: dict, max_hold: int):
+    global _data, _r_vals, _index
+    _data, _r_vals = data, r_vals
+    _index = FirstPassageIndex(np.log(data['close'].to_numpy()), max_hold)
+    _atr.clear()
+
+
+def _run_shard(lookback: int, atr_lookback: int, configs: list):
+    """Une tâche = un bloc de configurations (tp, sl, hold) d'un (lookback, atr_lookback)."""
+    close = np.log(_data['close'].to_numpy())
+    if atr_lookback not in _atr:
+        _atr[atr_lookback] = log_atr(_data, atr_lookback)
+
+    rows = [{'lookback': lookback, 'atr_lookback': atr_lookback, **rec}
+            for rec in grid_records(close, _atr[atr_lookback], _r_vals[lookback],
+                                    atr_lookback, configs, _index)]
+    return lookback, atr_lookback, rows
+
+
+def _read_done(results_path: str, fingerprint: str) -> pd.DataFrame:
+    if not os.path.exists(results_path) or os.path.getsize(results_path) == 0:
+        return pd.DataFrame(columns=GRID_COLUMNS)
+    done = pd.read_csv(results_path)
+    # Lignes d'un autre jeu de données (autre paire, bougies mises à jour)
+    if 'data' not in done.columns or (done['data'] != fingerprint).any():
+        raise ValueError(f"{results_path} holds grid results for other data; "
+                         f"remove it or pass another results_path")
+    return done
+
+
+def _drop_partial_line(results_path: str):
+    # Run interrompu en pleine écriture : dernière ligne sans '\n' supprimée
+    if not os.path.exists(results_path):
+        return
+    with open(results_path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def _append_rows(results_path: str, rows: list, fingerprint: str):
+    """Ajoute les lignes d'une tâche terminée puis force l'écriture disque."""
+    if not rows:
+        return
+    header = not os.path.exists(results_path) or os.path.getsize(results_path) == 0
+    table  = pd.DataFrame(rows, columns=GRID_COLUMNS[:-1]).assign(data=fingerprint)
+    with open(results_path, 'a') as f:
+        table.to_csv(f, header=header, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def run_grid_search_resumable(data, lookbacks, hold_periods, tp_mults, sl_mults,
+                              atr_lookbacks=(168,), results_path='grid_results.csv',
+                              n_jobs=None, min_trades=20, shard_size=16,
+                              cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Grille lookback × atr_lookback × hold × TP × SL répartie sur un pool de
+    processus, par blocs de shard_size configurations. Chaque bloc terminé
+    est ajouté à results_path (CSV, une ligne par combinaison, N quelconque,
+    empreinte des données dans la colonne data) ; au redémarrage, les
+    combinaisons déjà présentes sont sautées. ValueError si le fichier a été
+    produit sur d'autres données.
+    Retourne le tableau complet filtré sur n >= min_trades (mêmes colonnes
+    que run_fast_grid_search, plus atr_lookback).
+    """
+    fingerprint = data_fingerprint(data)
+    _drop_partial_line(results_path)
+    done = _read_done(results_path, fingerprint)
+    done_keys = set(zip(*(done[k].tolist() for k in GRID_KEY)))
+
+    # Combinaisons restantes, par blocs d'un même (lookback, atr_lookback)
+    shards = []
+    for lb, atr_lookback in itertools.product(lookbacks, atr_lookbacks):
+        configs = [(tp, sl, hp) for hp, tp, sl
+                   in itertools.product(hold_periods, tp_mults, sl_mults)
+                   if (lb, atr_lookback, hp, tp, sl) not in done_keys]
+        shards += [(lb, atr_lookback, configs[k:k + shard_size])
+                   for k in range(0, len(configs), shard_size)]
+
+    total = len(lookbacks) * len(atr_lookbacks) * len(hold_periods) * len(tp_mults) * len(sl_mults)
+    todo  = sum(len(configs) for _, _, configs in shards)
+    print(f"Grille : {total} combinaisons, {total - todo} déjà dans {results_path}, "
+          f"{todo} à calculer ({len(shards)} tâches)")
+
+    if shards:
+        # Trendlines d'abord, chaque lookback sur tous les cœurs (cache disque)
+        close  = np.log(data['close'].to_numpy())
+        r_vals = {lb: np.asarray(cached_fit_trendlines_rolling(close, lb, cache_dir=cache_dir,
+                                                               n_jobs=n_jobs)[3])
+                  for lb in dict.fromkeys(lb for lb, _, _ in shards)}
+        init   = (data, r_vals, max(hold_periods))
+
+        def record(lb, atr_lookback, rows):
+            _append_rows(results_path, rows, fingerprint)
+            print(f"  ✓ lookback={lb} atr={atr_lookback} : {len(rows)} combinaisons enregistrées")
+
+        n_jobs = min(_resolve_n_jobs(n_jobs), len(shards))
+        if n_jobs == 1:
+            _attach_grid(*init)
+            for shard in shards:
+                record(*_run_shard(*shard))
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach_grid,
+                                     initargs=init) as pool:
+                futures = [pool.submit(_run_shard, *shard) for shard in shards]
+                # Écriture par le process principal uniquement, au fil de l'eau
+                for fut in as_completed(futures):
+                    record(*fut.result())
+
+    # Tableau de la grille demandée (le fichier peut en contenir d'autres)
+    df = _read_done(results_path, fingerprint).drop_duplicates(subset=GRID_KEY, keep='last')
+    df = df[df['lookback'].isin(lookbacks) & df['atr_lookback'].isin(atr_lookbacks)
+            & df['hold'].isin(hold_periods) & df['tp'].isin(tp_mults) & df['sl'].isin(sl_mults)]
+    return df[df['n'] >= min_trades].drop(columns='data').reset_index(drop=True)
+
+
 if __name__ == '__main__':
     data = pd.read_csv('BTCUSDT3600.csv')
     data['date'] = data['date'].astype('datetime64[s]')
@@ -90,9 +225,9 @@ if __name__ == '__main__':
     tp_mults     = [1.5, 2.0, 3.0]         # TP en ATR
     sl_mults     = [1.0, 1.5, 2.0, 3.0]    # SL en ATR
 
-    results = run_fast_grid_search(data, lookbacks, hold_periods, tp_mults, sl_mults)
-
-    df = pd.DataFrame(results)
+    # Reprend grid_results.csv si un run précédent a été interrompu
+    df = run_grid_search_resumable(data, lookbacks, hold_periods, tp_mults, sl_mults,
+                                   results_path='grid_results.csv')
 
     # ── Top 15 par Profit Factor ─────────────────────────────────────────────
     top = df.sort_values('pf', ascending=False).head(15)
@@ -11,9 +11,14 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 from walkforward_multi import load_pair, walkforward_multi
+from results_store import DEFAULT_STORE_DIR
+from threshold_curve import ThresholdCurve
 from trendline_break_dataset import trendline_breakout_dataset
 import xgboost as xgb
 
+# Rééchantillonnages bootstrap par paire (0 → sélection sur le PF ponctuel)
+N_BOOTSTRAP = 5000
+
 
 def evaluate_threshold(trades, threshold):
     trades = trades.dropna(subset=['model_prob'])
@@ -31,28 +36,37 @@ def evaluate_threshold(trades, threshold):
     }
 
 
-def analyze_pair(name, trades, thresholds, is_synthetic=False):
-    """Calcule PF/WR/N pour chaque seuil et retourne le meilleur."""
-    pf_list, wr_list, n_list = [], [], []
-
-    for thr in thresholds:
-        ev = evaluate_threshold(trades, thr)
-        if ev:
-            pf_list.append(ev['pf'])
-            wr_list.append(ev['wr'])
-            n_list.append(ev['n'])
-        else:
-            pf_list.append(0)
-            wr_list.append(0)
-            n_list.append(0)
-
-    trades_clean = trades.dropna(subset=['model_prob'])
-    min_trades   = max(20, int(len(trades_clean) * 0.20))
-
+def analyze_pair(name, trades, thresholds, is_synthetic=False, n_boot=0, ci=0.90):
+    """
+    Calcule PF/WR/N pour chaque seuil et retourne le meilleur.
+    n_boot > 0 : bandes de confiance du PF par bootstrap, et le seuil
+    retenu maximise la borne basse du PF au lieu du PF ponctuel.
+    """
+    # Toute la grille en une passe (trades triés une fois par model_prob)
+    curve = ThresholdCurve(trades['model_prob'], trades['return'])
+    stats = curve.at(thresholds)
+    valid = stats['n'].to_numpy() >= 10    # même règle que evaluate_threshold
+
+    pf_list = np.where(valid, stats['pf'].round(4), 0).tolist()
+    wr_list = np.where(valid, stats['wr'].round(4), 0).tolist()
+    n_list  = np.where(valid, stats['n'], 0).tolist()
+
+    min_trades   = max(20, int(len(curve) * 0.20))
+
+    # Critère de sélection : PF ponctuel ou borne basse bootstrap
+    score = pf_list
+    if n_boot:
+        bands   = curve.bootstrap(thresholds, n_boot=n_boot, ci=ci)
+        lo_list = np.where(valid, bands['pf_lo'].round(4), 0).tolist()
+        hi_list = np.where(valid, bands['pf_hi'].round(4), 0).tolist()
+        score   = lo_list
+
+    best_score = 0
     best_pf = 0
     best_thr = 0.5
     for i, thr in enumerate(thresholds):
-        if n_list[i] >= min_trades and pf_list[i] > best_pf:
+        if n_list[i] >= min_trades and score[i] > best_score:
+            best_score = score[i]
             best_pf  = pf_list[i]
             best_thr = round(thr, 2)
 
@@ -65,15 +79,18 @@ def analyze_pair(name, trades, thresholds, is_synthetic=False):
         print(f"  ⚠️  Modèle entraîné sur crypto réelle — interpréter avec")
         print(f"      précaution. Le V75 est généré algorithmiquement.")
         print(f"  {'-'*50}")
-    print(f"  {'Seuil':>7} {'PF':>7} {'WinRate':>8} {'N trades':>9}")
-    print(f"  {'-'*40}")
+    band_head = f" {'PF bas':>7} {'PF haut':>7}" if n_boot else ""
+    print(f"  {'Seuil':>7} {'PF':>7}{band_head} {'WinRate':>8} {'N trades':>9}")
+    print(f"  {'-'*(56 if n_boot else 40)}")
     for i, thr in enumerate(thresholds):
         marker = " ← OPTIMAL" if round(thr, 2) == best_thr else ""
+        band   = f" {lo_list[i]:>7.4f} {hi_list[i]:>7.4f}" if n_boot else ""
         if n_list[i] > 0:
-            print(f"  {thr:>7.2f} {pf_list[i]:>7.4f} "
+            print(f"  {thr:>7.2f} {pf_list[i]:>7.4f}{band} "
                   f"{wr_list[i]:>8.4f} {n_list[i]:>9}{marker}")
+    criterion = f"borne basse IC {ci:.0%} du PF={best_score}, " if n_boot else ""
     print(f"\n  → Seuil optimal : {best_thr}  "
-          f"(PF={best_pf}, min {min_trades} trades requis)")
+          f"(PF={best_pf}, {criterion}min {min_trades} trades requis)")
 
     return pf_list, wr_list, n_list, best_thr, best_pf, min_trades
 
@@ -104,13 +121,16 @@ if __name__ == '__main__':
     print(f"Indice synthétique: {'V75' if v75_data is not None else 'non disponible'}")
 
     # ── Walk-forward sur paires réelles ──────────────────────────────────────
+    from strategies.trendline_strategy import TrendlineBreakoutStrategy
+    strategy_instance = TrendlineBreakoutStrategy(lookback=72, hold_period=24)
+
     print("\nCalcul des probabilités (walk-forward sur crypto réelle)...")
     results = walkforward_multi(
         pairs_data,
-        lookback    = 72,
-        hold_period = 24,
+        strategy    = strategy_instance,
         train_size  = 365 * 24 * 2,
-        step_size   = 365 * 24
+        step_size   = 365 * 24,
+        store_dir   = DEFAULT_STORE_DIR
     )
 
     # ── Si V75 disponible : appliquer le DERNIER modèle entraîné ─────────────
@@ -142,7 +162,7 @@ if __name__ == '__main__':
     # Paires réelles
     for name, res in results.items():
         pf_list, wr_list, n_list, best_thr, best_pf, min_t = analyze_pair(
-            name, res['trades'], thresholds, is_synthetic=False
+            name, res['trades'], thresholds, is_synthetic=False, n_boot=N_BOOTSTRAP
         )
         all_results[name] = {
             'pf': pf_list, 'wr': wr_list, 'n': n_list,
@@ -153,7 +173,7 @@ if __name__ == '__main__':
     # V75 synthétique
     if v75_data is not None:
         pf_list, wr_list, n_list, best_thr, best_pf, min_t = analyze_pair(
-            'V75', v75_trades, thresholds, is_synthetic=True
+            'V75', v75_trades, thresholds, is_synthetic=True, n_boot=N_BOOTSTRAP
         )
         all_results['V75'] = {
             'pf': pf_list, 'wr': wr_list, 'n': n_list,
@@ -15,6 +15,11 @@ import matplotlib.dates as mdates
 
 from walkforward_multi import load_pair, walkforward_multi
 from walkforward_with_fees import apply_fees, FEES
+from results_store import DEFAULT_STORE_DIR
+
+# Seuil ML choisi par fold sur ses propres probas out-of-fold
+# (walkforward_multi nested_thresholds) ; THRESHOLDS ne sert que de repli.
+NESTED_THRESHOLDS = True
 
 # Seuils ML optimisés empiriquement (Profit Factor maximum)
 THRESHOLDS = {
@@ -52,7 +57,9 @@ def run_portfolio_simulation():
         strategy    = strategy_instance,
         train_size  = 365 * 24 * 2,
         step_size   = 365 * 24,
-        thresholds  = THRESHOLDS
+        thresholds  = THRESHOLDS,
+        nested_thresholds = NESTED_THRESHOLDS,
+        store_dir   = DEFAULT_STORE_DIR
     )
 
     # 3. Récolter tous les trades viables de l'IA
@@ -66,9 +73,14 @@ def run_portfolio_simulation():
         trades = apply_fees(trades, name)
         
         # 3.b : Ne garder QUE les trades autorisés par l'IA (prob >= seuil d'exigence)
-        thresh = THRESHOLDS.get(name, 0.5)
+        if NESTED_THRESHOLDS:
+            thresh = trades['threshold']
+            label  = f"par fold {sorted(set(res['fold_thresholds'].values()))}"
+        else:
+            thresh = THRESHOLDS.get(name, 0.5)
+            label  = thresh
         filtered_trades = trades[trades['model_prob'] >= thresh].copy()
-        print(f"  → {name:3} autorisé: {len(filtered_trades)} trades (Seuil: {thresh})")
+        print(f"  → {name:3} autorisé: {len(filtered_trades)} trades (Seuil: {label})")
         
         # Exclure les trades ouverts à la toute fin du dataset qui n'ont pas encore de date de sortie
         filtered_trades = filtered_trades.dropna(subset=['entry_i', 'exit_i']).copy()
@@ -0,0 +1,108 @@
+"""
+parallel_trendlines.py
+----------------------
+Fit des trendlines sur plusieurs cœurs.
+
+Les fits de chaque bougie sont indépendants : la plage de bougies est
+découpée en blocs, chaque bloc relisant les `lookback` bougies précédentes
+(chevauchement avec le bloc d'avant), et les blocs sont envoyés à un pool
+de processus.
+
+Le tableau des log-close est partagé via multiprocessing.shared_memory
+(pas de pickle du tableau à chaque tâche). Les résultats sont identiques
+bit à bit au chemin série (fit_trendlines_rolling / fit_trendlines_multi).
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from trendline_automation import fit_trendlines_rolling, fit_trendlines_multi
+
+# Tableau partagé, attaché une fois par processus worker
+_shm = None
+_close = None
+
+
+def _attach(shm_name: str, n: int):
+    global _shm, _close
+    # Garder une référence au segment : le tableau pointe dans son buffer
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _close = np.ndarray((n,), dtype=np.float64, buffer=_shm.buf)
+
+
+def _fit_block(lookback: int, start: int, end: int):
+    s_coefs, r_coefs, _, _ = fit_trendlines_rolling(_close, lookback, start=start, end=end)
+    return lookback, start, end, s_coefs[start:end], r_coefs[start:end]
+
+
+def _resolve_n_jobs(n_jobs):
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def _blocks(n: int, lookback: int, n_jobs: int, blocks_per_job: int = 4):
+    # Quelques blocs par worker pour équilibrer la charge
+    first = min(lookback, n)
+    n_blocks = max(1, n_jobs * blocks_per_job)
+    bounds = np.linspace(first, n, n_blocks + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _run(close: np.array, lookbacks: list, n_jobs: int):
+    """Retourne {lookback: (s_coefs, r_coefs)} calculés en parallèle."""
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    n = len(close)
+    out = {lb: (np.full((n, 2), np.nan), np.full((n, 2), np.nan)) for lb in lookbacks}
+
+    shm = shared_memory.SharedMemory(create=True, size=max(close.nbytes, 1))
+    try:
+        np.ndarray((n,), dtype=np.float64, buffer=shm.buf)[:] = close
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach,
+                                 initargs=(shm.name, n)) as pool:
+            futures = [
+                pool.submit(_fit_block, lb, a, b)
+                for lb in lookbacks
+                for a, b in _blocks(n, lb, n_jobs)
+            ]
+            for fut in futures:
+                lb, a, b, s_block, r_block = fut.result()
+                out[lb][0][a:b] = s_block
+                out[lb][1][a:b] = r_block
+    finally:
+        shm.close()
+        shm.unlink()
+    return out
+
+
+def fit_trendlines_parallel(close: np.array, lookback: int, n_jobs: int = None):
+    """Même sortie que fit_trendlines_rolling (n_jobs=None → tous les cœurs)."""
+    n_jobs = _resolve_n_jobs(n_jobs)
+    if n_jobs == 1:
+        return fit_trendlines_rolling(close, lookback)
+
+    s_coefs, r_coefs = _run(close, [lookback], n_jobs)[lookback]
+    s_vals = s_coefs[:, 1] + lookback * s_coefs[:, 0]
+    r_vals = r_coefs[:, 1] + lookback * r_coefs[:, 0]
+    return s_coefs, r_coefs, s_vals, r_vals
+
+
+def fit_trendlines_multi_parallel(close: np.array, lookbacks: list, n_jobs: int = None):
+    """Même sortie que fit_trendlines_multi, tous lookbacks dans un seul pool."""
+    n_jobs = _resolve_n_jobs(n_jobs)
+    n = len(close)
+    s_vals = np.full((len(lookbacks), n), np.nan)
+    r_vals = np.full((len(lookbacks), n), np.nan)
+    if n < 2:
+        return s_vals, r_vals
+
+    if n_jobs == 1:
+        return fit_trendlines_multi(close, lookbacks)
+
+    fitted = _run(close, list(dict.fromkeys(lookbacks)), n_jobs)
+    for k, lb in enumerate(lookbacks):
+        s_coefs, r_coefs = fitted[lb]
+        s_vals[k] = s_coefs[:, 1] + lb * s_coefs[:, 0]
+        r_vals[k] = r_coefs[:, 1] + lb * r_coefs[:, 0]
+    return s_vals, r_vals
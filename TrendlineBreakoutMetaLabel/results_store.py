@@ -0,0 +1,210 @@
+"""
+results_store.py
+----------------
+Stockage disque des résultats de walkforward_multi.
+
+optimize_threshold, walkforward_with_fees et paper_trading_backtest n'ont
+besoin que des probabilités et des signaux : plutôt que de relancer datasets
++ entraînement de tous les folds, le premier run écrit ses résultats et les
+suivants les relisent en quelques millisecondes.
+
+Une entrée = un dossier, adressé par
+  hash(stratégie + paramètres du walk-forward + données OHLCV)
+  + STORE_VERSION + SOLVER_VERSION (trendline_automation)
+et organisé en colonnes .npy (chargées en memory-map) :
+
+  <clé>/meta.json                noms des colonnes, paramètres
+  <clé>/<paire>/signal.npy       int8
+  <clé>/<paire>/dumb_signal.npy  int8
+  <clé>/<paire>/trades_<k>.npy   une colonne des trades (model_prob inclus)
+  <clé>/<paire>/x_<k>.npy        une colonne des features
+  <clé>/<paire>/fold_ends.npy    fin de chaque fold utilisé par la paire
+  <clé>/<paire>/threshold_*.npy  seuil ML de chaque fold (nested_thresholds)
+  <clé>/models/fold_<fin>.pkl    méta-modèles des folds (partagés entre paires)
+
+Invalidation : une autre STORE_VERSION ou SOLVER_VERSION, d'autres données
+ou d'autres paramètres donnent une autre clé ; les entrées d'anciennes
+versions sont supprimées. STORE_VERSION est à incrémenter à chaque
+changement des features ou du walk-forward qui modifie les résultats.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import numpy as np
+import pandas as pd
+from trade_index import time_key
+from trendline_automation import SOLVER_VERSION
+
+STORE_VERSION = 'v2'
+DEFAULT_STORE_DIR = '.wf_results'
+
+# Attributs de stratégie sans effet sur les résultats
+_RUNTIME_ATTRS = ('cache_dir', 'n_jobs')
+
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    h = hashlib.sha1(df.index.values.astype('datetime64[s]').astype(np.int64).tobytes())
+    for col in ('open', 'high', 'low', 'close', 'volume'):
+        h.update(np.ascontiguousarray(df[col].to_numpy(), dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+def _ends_array(ends: list) -> np.array:
+    # Fins de fold → int64 (bougies) ou datetime64[s] (align='time')
+    time_ends = bool(ends) and isinstance(ends[0], pd.Timestamp)
+    return np.array(ends, dtype='datetime64[s]' if time_ends else np.int64)
+
+
+def _ends_list(ends: np.array) -> list:
+    return [pd.Timestamp(e) if isinstance(e, np.datetime64) else int(e) for e in ends]
+
+
+def _fold_token(end) -> str:
+    # Fin de fold : bougie (int) ou horodatage (align='time')
+    return str(int(end)) if isinstance(end, (int, np.integer)) else str(time_key(end))
+
+
+def _version_prefix() -> str:
+    # Signaux et modèles dépendent aussi des trendlines → version du solveur
+    return f"{STORE_VERSION}_{SOLVER_VERSION}_"
+
+
+class ResultsStore:
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self._purge_old_versions()
+
+    # ── Clés / dossiers ─────────────────────────────────────────────────────
+    @staticmethod
+    def key(pairs_data: dict, strategy, params: dict) -> str:
+        strategy_params = {k: v for k, v in vars(strategy).items() if k not in _RUNTIME_ATTRS}
+        desc = {
+            'strategy': type(strategy).__name__,
+            'strategy_params': repr(sorted(strategy_params.items())),
+            'params': repr(sorted(params.items())),
+            'data': {name: data_fingerprint(df) for name, df in pairs_data.items()},
+        }
+        digest = hashlib.sha1(json.dumps(desc, sort_keys=True).encode()).hexdigest()
+        return f"{_version_prefix()}{digest}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.store_dir, key)
+
+    def _purge_old_versions(self):
+        prefix = _version_prefix()
+        for name in os.listdir(self.store_dir):
+            if not name.startswith(prefix):
+                shutil.rmtree(os.path.join(self.store_dir, name), ignore_errors=True)
+
+    # ── Écriture ────────────────────────────────────────────────────────────
+    def put(self, key: str, results: dict, params: dict = None):
+        path = self.path(key)
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(os.path.join(tmp_path, 'models'))
+
+        meta = {'version': STORE_VERSION, 'solver_version': SOLVER_VERSION,
+                'params': repr(params), 'pairs': {}}
+        for name, res in results.items():
+            pair_dir = os.path.join(tmp_path, name)
+            os.makedirs(pair_dir)
+            np.save(os.path.join(pair_dir, 'signal.npy'), res['signal'].astype(np.int8))
+            np.save(os.path.join(pair_dir, 'dumb_signal.npy'), res['dumb_signal'].astype(np.int8))
+
+            trades, data_x = res['trades'], res['data_x']
+            np.save(os.path.join(pair_dir, 'trades_index.npy'), trades.index.to_numpy())
+            for k, col in enumerate(trades.columns):
+                np.save(os.path.join(pair_dir, f'trades_{k}.npy'), trades[col].to_numpy())
+            np.save(os.path.join(pair_dir, 'x_index.npy'), data_x.index.to_numpy())
+            for k, col in enumerate(data_x.columns):
+                np.save(os.path.join(pair_dir, f'x_{k}.npy'), data_x[col].to_numpy())
+
+            # Modèles : un fichier par fold, partagé par toutes les paires
+            ends = list(res['fold_models'])
+            for end, model in res['fold_models'].items():
+                model_path = os.path.join(tmp_path, 'models', f'fold_{_fold_token(end)}.pkl')
+                if not os.path.exists(model_path):
+                    with open(model_path, 'wb') as f:
+                        pickle.dump(model, f)
+            np.save(os.path.join(pair_dir, 'fold_ends.npy'), _ends_array(ends))
+
+            # Seuils par fold (nested_thresholds)
+            if 'fold_thresholds' in res:
+                thresholds = res['fold_thresholds']
+                np.save(os.path.join(pair_dir, 'threshold_ends.npy'), _ends_array(list(thresholds)))
+                np.save(os.path.join(pair_dir, 'threshold_values.npy'),
+                        np.array(list(thresholds.values()), dtype=np.float64))
+
+            meta['pairs'][name] = {
+                'trades_columns': list(trades.columns),
+                'x_columns': list(data_x.columns),
+            }
+
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=1)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    # ── Lecture ─────────────────────────────────────────────────────────────
+    def get(self, key: str, pairs_data: dict, load_models: bool = True):
+        """
+        Même structure que walkforward_multi, ou None si absent.
+        signal / dumb_signal sont des int8 en memory-map.
+        load_models=False → fold_models / model non désérialisés (None).
+        """
+        path = self.path(key)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        def column(pair_dir, name):
+            return np.load(os.path.join(pair_dir, name), mmap_mode='r', allow_pickle=False)
+
+        results = {}
+        for name, cols in meta['pairs'].items():
+            if name not in pairs_data:
+                return None
+            pair_dir = os.path.join(path, name)
+            df = pairs_data[name]
+
+            trades = pd.DataFrame(
+                {col: column(pair_dir, f'trades_{k}.npy') for k, col in enumerate(cols['trades_columns'])},
+                index=column(pair_dir, 'trades_index.npy')
+            )
+            data_x = pd.DataFrame(
+                {col: column(pair_dir, f'x_{k}.npy') for k, col in enumerate(cols['x_columns'])},
+                index=column(pair_dir, 'x_index.npy')
+            )
+
+            fold_models = None
+            if load_models:
+                fold_models = {}
+                for end in _ends_list(np.load(os.path.join(pair_dir, 'fold_ends.npy'))):
+                    with open(os.path.join(path, 'models', f'fold_{_fold_token(end)}.pkl'), 'rb') as f:
+                        fold_models[end] = pickle.load(f)
+
+            results[name] = {
+                'signal': column(pair_dir, 'signal.npy'),
+                'dumb_signal': column(pair_dir, 'dumb_signal.npy'),
+                'trades': trades,
+                'data_x': data_x,
+                'close': np.log(df['close'].to_numpy()),
+                'df': df,
+                'model': list(fold_models.values())[-1] if fold_models else None,
+                'fold_models': fold_models
+            }
+
+            threshold_path = os.path.join(pair_dir, 'threshold_ends.npy')
+            if os.path.exists(threshold_path):
+                ends   = _ends_list(np.load(threshold_path))
+                values = np.load(os.path.join(pair_dir, 'threshold_values.npy'))
+                results[name]['fold_thresholds'] = dict(zip(ends, values.tolist()))
+
+        return results
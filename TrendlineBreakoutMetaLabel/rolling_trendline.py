@@ -0,0 +1,326 @@
+"""
+rolling_trendline.py
+--------------------
+Mise à jour incrémentale des trendlines bougie par bougie.
+
+Au lieu de refitter toute la fenêtre à chaque nouvelle bougie, RollingTrendline
+garde les enveloppes convexes (haute et basse) de la fenêtre : les lignes de
+support / résistance optimales touchent toujours un sommet de l'enveloppe.
+
+  - push(price)  : ajoute la bougie la plus récente      → O(1) amorti
+  - pop_oldest() : retire la bougie la plus ancienne      → O(1) amorti
+  - support_coefs / resist_coefs : (slope, intercept)    → O(log lookback)
+
+Les coefficients sont exprimés dans le repère de la fenêtre (x = 0 sur la
+bougie la plus ancienne), comme fit_trendlines_single, et donnent le même
+résultat que le solveur exact (method='exact') tant que le pivot est unique.
+
+Égalités : si plusieurs bougies sont à égale distance de la droite des
+moindres carrés (prix arrondis / entiers, petits lookbacks), les deux
+solveurs peuvent retenir des pivots différents. Le choix du solveur exact
+(premier argmin / argmax) dépend alors de l'arrondi de ses propres résidus,
+que la pente calculée ici par sommes glissantes ne reproduit pas. Les deux
+lignes sont valides (elles touchent les prix) mais diffèrent de l'ordre de
+SLACK, voire davantage (jusqu'à ~1e-3 observé).
+"""
+
+from collections import deque
+import numpy as np
+
+
+# Même marge que check_trend_line / optimize_slope_exact
+SLACK = 1e-5
+
+
+def _slope(a, b):
+    return (b[1] - a[1]) / (b[0] - a[0])
+
+
+def _cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+class _Reversed:
+    """Vue gauche → droite d'une pile dont le sommet est le point le plus à gauche."""
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, k):
+        return self.items[-1 - k]
+
+
+def _first_edge(chain, lo, hi, cond):
+    """
+    Premier k de [lo, hi - 1] tel que k == hi - 1 ou cond(k) est vrai,
+    cond(k) portant sur l'arête chain[k] → chain[k + 1] (prédicat monotone
+    le long d'une chaîne convexe) → recherche binaire.
+    """
+    last = hi - 1
+    while lo < last:
+        mid = (lo + last) // 2
+        if cond(mid):
+            last = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _argmin_direction(chain, b):
+    """Sommet minimisant v - b * t (premier en cas d'égalité)."""
+    return _first_edge(chain, 0, len(chain),
+                       lambda k: _slope(chain[k], chain[k + 1]) >= b)
+
+
+def _tangent(chain, lo, hi, p):
+    """Point de contact de la tangente issue de p sur chain[lo:hi]."""
+    return _first_edge(chain, lo, hi,
+                       lambda k: _slope(chain[k], chain[k + 1]) >= _slope(p, chain[k]))
+
+
+class _SlidingLowerHull:
+    """
+    Enveloppe convexe basse d'une fenêtre glissante de points (t, v),
+    t strictement croissant.
+
+    Technique de la file à deux piles :
+      - "back"  : points récents, enveloppe construite de gauche à droite
+                  (monotone chain, on ne retire jamais par la gauche)
+      - "front" : points anciens, enveloppe construite de droite à gauche
+                  avec un journal d'annulation. Retirer le point le plus
+                  ancien = annuler sa dernière insertion.
+    Quand front est vide, les points de back y sont transférés. Chaque point
+    est inséré / retiré un nombre constant de fois → O(1) amorti.
+    """
+
+    def __init__(self):
+        self.back_pts = []
+        self.back_hull = []
+        self.front_hull = []    # sommet de pile = point le plus à gauche
+        self.front_undo = []    # sommets retirés à chaque insertion
+        self.n_front = 0
+
+    def push(self, p):
+        self.back_pts.append(p)
+        hull = self.back_hull
+        while len(hull) >= 2 and _cross(hull[-2], hull[-1], p) <= 0:
+            hull.pop()
+        hull.append(p)
+
+    def pop_oldest(self):
+        if self.n_front == 0:
+            self._transfer()
+        self.front_hull.pop()
+        for q in reversed(self.front_undo.pop()):
+            self.front_hull.append(q)
+        self.n_front -= 1
+
+    def _transfer(self):
+        hull = self.front_hull
+        for p in reversed(self.back_pts):
+            removed = []
+            while len(hull) >= 2 and _cross(p, hull[-1], hull[-2]) <= 0:
+                removed.append(hull.pop())
+            hull.append(p)
+            self.front_undo.append(removed)
+        self.n_front = len(self.back_pts)
+        self.back_pts = []
+        self.back_hull = []
+
+    def support(self, b, slack):
+        """
+        Pivot du support pour une pente de référence b (le plus ancien en cas
+        d'égalité, cf. docstring du module), et intervalle des pentes
+        valides [lower, upper] pour une ligne passant par ce pivot
+        (les autres points sont décalés de +slack, cf. optimize_slope_exact).
+        """
+        front = _Reversed(self.front_hull)
+        back = self.back_hull
+
+        # ── Pivot : point le plus bas dans la direction b ───────────────────
+        candidates = []
+        if len(front):
+            k = _argmin_direction(front, b)
+            candidates.append((front[k][1] - b * front[k][0], 0, k))
+        if len(back):
+            k = _argmin_direction(back, b)
+            candidates.append((back[k][1] - b * back[k][0], 1, k))
+        _, side, k = min(candidates)
+
+        # Pivot abaissé de slack : les bornes deviennent des tangentes
+        if side == 0:
+            pivot = front[k]
+            p = (pivot[0], pivot[1] - slack)
+            lower = -np.inf
+            if k > 0:
+                lower = _slope(front[_tangent(front, 0, k, p)], p)
+            upper = np.inf
+            if k + 1 < len(front):
+                upper = _slope(p, front[_tangent(front, k + 1, len(front), p)])
+            if len(back):
+                upper = min(upper, _slope(p, back[_tangent(back, 0, len(back), p)]))
+        else:
+            pivot = back[k]
+            p = (pivot[0], pivot[1] - slack)
+            lower = -np.inf
+            if k > 0:
+                lower = _slope(back[_tangent(back, 0, k, p)], p)
+            if len(front):
+                lower = max(lower, _slope(front[_tangent(front, 0, len(front), p)], p))
+            upper = np.inf
+            if k + 1 < len(back):
+                upper = _slope(p, back[_tangent(back, k + 1, len(back), p)])
+
+        return pivot, lower, upper
+
+
+class RollingTrendline:
+    """
+    Trendlines de support / résistance d'une fenêtre glissante, mises à
+    jour bougie par bougie.
+
+        tl = RollingTrendline(lookback=72)
+        for price in close:
+            tl.update(price)           # push + pop_oldest si fenêtre pleine
+            s_coefs = tl.support_coefs
+            r_coefs = tl.resist_coefs
+
+    La résistance est calculée comme le support de -price (enveloppe haute
+    = enveloppe basse des prix opposés).
+    """
+
+    def __init__(self, lookback: int = None):
+        self.lookback = lookback
+        self.window = deque()
+        self._t = 0
+        self._lower = _SlidingLowerHull()
+        self._upper = _SlidingLowerHull()
+        self._rebase()
+        self._coefs = None
+
+    def __len__(self):
+        return len(self.window)
+
+    # ── Sommes glissantes (moindres carrés) ─────────────────────────────────
+    def _rebase(self):
+        # Recalcul exact des sommes autour d'une nouvelle origine pour
+        # éviter la dérive numérique des ajouts / retraits successifs.
+        self._t0 = self.window[0][0] if self.window else self._t
+        self._y0 = self.window[0][1] if self.window else 0.0
+        self._su = self._suu = self._sw = self._suw = 0.0
+        for t, y in self.window:
+            self._add(t, y, 1.0)
+
+    def _add(self, t, y, sign):
+        u = t - self._t0
+        w = y - self._y0
+        self._su += sign * u
+        self._suu += sign * u * u
+        self._sw += sign * w
+        self._suw += sign * u * w
+
+    # ── Mises à jour ─────────────────────────────────────────────────────────
+    def push(self, price: float):
+        p = (self._t, float(price))
+        self._t += 1
+        self.window.append(p)
+        self._add(p[0], p[1], 1.0)
+        self._lower.push(p)
+        self._upper.push((p[0], -p[1]))
+        self._coefs = None
+
+    def pop_oldest(self):
+        t, y = self.window.popleft()
+        self._add(t, y, -1.0)
+        rebuilt = self._lower.n_front == 0
+        self._lower.pop_oldest()
+        self._upper.pop_oldest()
+        if rebuilt:
+            # Les enveloppes viennent d'être reconstruites (tous les
+            # ~lookback retraits) : on en profite pour recalculer les sommes.
+            self._rebase()
+        self._coefs = None
+
+    def update(self, price: float):
+        self.push(price)
+        if self.lookback is not None and len(self.window) > self.lookback:
+            self.pop_oldest()
+
+    # ── Coefficients ─────────────────────────────────────────────────────────
+    def _fit(self):
+        n = len(self.window)
+        if n == 0:
+            raise ValueError("RollingTrendline is empty")
+        t_first, y_first = self.window[0]
+        if n == 1:
+            return (0.0, y_first), (0.0, y_first)
+
+        # Pente de la droite des moindres carrés (sert à choisir les pivots)
+        su, suu, sw, suw = self._su, self._suu, self._sw, self._suw
+        b = (n * suw - su * sw) / (n * suu - su * su)
+
+        support = self._solve(self._lower, b, 1.0, n)
+        resist = self._solve(self._upper, -b, -1.0, n)
+        return support, resist
+
+    def _solve(self, hull, b, sign, n):
+        # sign = -1 : résistance = support des prix opposés
+        pivot, lower, upper = hull.support(b, SLACK)
+        q = pivot[0] - self._t0
+        yq = sign * pivot[1] - self._y0
+        su, suu, sw, suw = self._su, self._suu, self._sw, self._suw
+
+        # Pente des moindres carrés contrainte à passer par le pivot
+        num = suw - q * sw - yq * su + n * q * yq
+        denom = suu - 2.0 * q * su + n * q * q
+        slope = sign * num / denom
+        slope = min(max(slope, lower), upper)
+
+        slope *= sign
+        x_pivot = pivot[0] - self.window[0][0]
+        return (slope, sign * pivot[1] - slope * x_pivot)
+
+    @property
+    def support_coefs(self):
+        if self._coefs is None:
+            self._coefs = self._fit()
+        return self._coefs[0]
+
+    @property
+    def resist_coefs(self):
+        if self._coefs is None:
+            self._coefs = self._fit()
+        return self._coefs[1]
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    import time
+    from trendline_automation import fit_trendlines_rolling
+
+    data = pd.read_csv('BTCUSDT3600.csv')
+    close = np.log(data['close'].to_numpy())
+    lookback = 72
+
+    t = time.time()
+    s_coefs, r_coefs, _, _ = fit_trendlines_rolling(close, lookback)
+    print(f"fit_trendlines_rolling : {time.time() - t:.2f}s")
+
+    t = time.time()
+    tl = RollingTrendline(lookback)
+    s_inc = np.full((len(close), 2), np.nan)
+    r_inc = np.full((len(close), 2), np.nan)
+    for i in range(len(close)):
+        # Coefficients de la fenêtre close[i - lookback: i], avant d'ajouter i
+        if len(tl) == lookback:
+            s_inc[i] = tl.support_coefs
+            r_inc[i] = tl.resist_coefs
+        tl.update(close[i])
+    print(f"RollingTrendline       : {time.time() - t:.2f}s")
+
+    print("Max diff support :", np.nanmax(np.abs(s_inc - s_coefs)))
+    print("Max diff resist  :", np.nanmax(np.abs(r_inc - r_coefs)))
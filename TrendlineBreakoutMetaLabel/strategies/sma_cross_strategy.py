@@ -3,6 +3,15 @@ import pandas as pd
 import pandas_ta as ta
 from base_strategy import Strategy
 
+try:
+    from trade_buffer import TradeBuffer
+    from triple_barrier import barrier_trades
+except ImportError:
+    import sys
+    sys.path.append('..')
+    from trade_buffer import TradeBuffer
+    from triple_barrier import barrier_trades
+
 class SMACrossoverStrategy(Strategy):
     """
     Stratégie de Croisement de Moyennes Mobiles Simples (ex: SMA 50 / SMA 200).
@@ -38,47 +47,43 @@ class SMACrossoverStrategy(Strategy):
         price_to_sma200 = (close_raw - sma_slow) / sma_slow
         sma_diff        = (sma_fast - sma_slow) / sma_slow
 
-        trades = pd.DataFrame()
-        trade_i = 0
-        in_trade = False
-        tp_price = sl_price = hp_i = None
-
-        # Start loop from where all indicators are filled
+        # Start from where all indicators are filled
         start_idx = max(self.slow_period, self.atr_period)
-        
-        for i in range(start_idx, len(ohlcv)):
-            # Croisement Haussier (Fast cross over Slow)
-            bull_cross = (sma_fast[i-1] <= sma_slow[i-1]) and (sma_fast[i] > sma_slow[i])
-            
-            # Entry logic
-            if not in_trade and bull_cross:
-                # Log-space TP/SL execution
-                tp_price = close[i] + atr_arr[i] * self.tp_mult
-                sl_price = close[i] - atr_arr[i] * self.sl_mult
-                hp_i     = i + self.hold_period
-                in_trade = True
 
-                trades.loc[trade_i, 'entry_i']   = i
-                trades.loc[trade_i, 'entry_p']   = close[i]
-                trades.loc[trade_i, 'atr']       = atr_arr[i]
-                trades.loc[trade_i, 'sl']        = sl_price
-                trades.loc[trade_i, 'tp']        = tp_price
-                trades.loc[trade_i, 'hp_i']      = hp_i
-                
-                # Assign contextual features to trade metadata
-                trades.loc[trade_i, 'rsi']             = rsi_14[i]
-                trades.loc[trade_i, 'adx']             = adx_14[i]
-                trades.loc[trade_i, 'vol']             = vol_arr[i]
-                trades.loc[trade_i, 'price_to_sma200'] = price_to_sma200[i]
-                trades.loc[trade_i, 'sma_diff']        = sma_diff[i]
+        # Croisement Haussier (Fast cross over Slow)
+        bull_cross = np.zeros(len(close), dtype=bool)
+        bull_cross[start_idx:] = (sma_fast[start_idx - 1:-1] <= sma_slow[start_idx - 1:-1]) & \
+                                 (sma_fast[start_idx:] > sma_slow[start_idx:])
+
+        # Log-space TP/SL execution, one position at a time
+        taken = barrier_trades(close, bull_cross, atr_arr,
+                               self.tp_mult, self.sl_mult, self.hold_period)
+
+        trades = TradeBuffer([
+            'entry_i', 'entry_p', 'atr', 'sl', 'tp', 'hp_i',
+            'rsi', 'adx', 'vol', 'price_to_sma200', 'sma_diff',
+            'exit_i', 'exit_p'
+        ])
+
+        for k, i in enumerate(taken['entry_i']):
+            # Assign contextual features to trade metadata
+            trades.append(
+                entry_i         = i,
+                entry_p         = close[i],
+                atr             = atr_arr[i],
+                sl              = taken['sl'][k],
+                tp              = taken['tp'][k],
+                hp_i            = taken['hp_i'][k],
+                rsi             = rsi_14[i],
+                adx             = adx_14[i],
+                vol             = vol_arr[i],
+                price_to_sma200 = price_to_sma200[i],
+                sma_diff        = sma_diff[i],
+                exit_i          = taken['exit_i'][k],
+                exit_p          = taken['exit_p'][k],
+            )
 
-            # Exit logic
-            if in_trade:
-                if close[i] >= tp_price or close[i] <= sl_price or i >= hp_i:
-                    trades.loc[trade_i, 'exit_i'] = i
-                    trades.loc[trade_i, 'exit_p'] = close[i]
-                    in_trade = False
-                    trade_i += 1
+        trades = trades.to_frame()
 
         if len(trades) == 0:
             return pd.DataFrame(), pd.DataFrame(), pd.Series(dtype=int)
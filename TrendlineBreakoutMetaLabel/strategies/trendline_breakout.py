@@ -2,30 +2,16 @@ import numpy as np
 import pandas as pd
 import pandas_ta as ta
 import matplotlib.pyplot as plt
-from trendline_automation import fit_trendlines_single
+from trendline_automation import fit_trendlines_rolling
 import mplfinance as mpf
 
-def trendline_breakout(close: np.array, lookback:int):
-    s_tl = np.zeros(len(close))
-    s_tl[:] = np.nan
-
-    r_tl = np.zeros(len(close))
-    r_tl[:] = np.nan
-
+def breakout_signal(close: np.array, s_tl: np.array, r_tl: np.array, lookback: int):
+    # Long above resistance, short below support, otherwise keep position
     sig = np.zeros(len(close))
 
     for i in range(lookback, len(close)):
-        # NOTE window does NOT include the current candle
-        window = close[i - lookback: i]
-
-        s_coefs, r_coefs = fit_trendlines_single(window)
-
-        # Find current value of line, projected forward to current bar
-        s_val = s_coefs[1] + lookback * s_coefs[0] 
-        r_val = r_coefs[1] + lookback * r_coefs[0] 
-
-        s_tl[i] = s_val
-        r_tl[i] = r_val
+        s_val = s_tl[i]
+        r_val = r_tl[i]
 
         if close[i] > r_val:
             sig[i] = 1.0
@@ -34,6 +20,14 @@ def trendline_breakout(close: np.array, lookback:int):
         else:
             sig[i] = sig[i - 1]
 
+    return sig
+
+
+def trendline_breakout(close: np.array, lookback:int):
+    # NOTE window does NOT include the current candle.
+    # s_tl / r_tl are the lines projected forward to the current bar.
+    _, _, s_tl, r_tl = fit_trendlines_rolling(close, lookback)
+    sig = breakout_signal(close, s_tl, r_tl, lookback)
     return s_tl, r_tl, sig
 
 
@@ -69,9 +63,14 @@ if __name__ == '__main__':
     lookbacks = list(range(24, 169, 2))
     pfs = []
 
+    # All lookbacks fitted in one pass (shared prefix sums)
+    from trendline_automation import fit_trendlines_multi
+    close = data['close'].to_numpy()
+    supports, resists = fit_trendlines_multi(close, lookbacks)
+
     lookback_returns = pd.DataFrame()
-    for lookback in lookbacks:
-        support, resist, signal = trendline_breakout(data['close'].to_numpy(), lookback)
+    for lookback, support, resist in zip(lookbacks, supports, resists):
+        signal = breakout_signal(close, support, resist, lookback)
         data['signal'] = signal
 
         data['r'] = np.log(data['close']).diff().shift(-1)
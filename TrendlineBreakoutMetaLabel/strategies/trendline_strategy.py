@@ -4,11 +4,15 @@ import pandas_ta as ta
 from base_strategy import Strategy
 
 try:
-    from trendline_automation import fit_trendlines_single
+    from trendline_cache import cached_fit_trendlines_rolling, DEFAULT_CACHE_DIR
+    from trade_buffer import TradeBuffer
+    from triple_barrier import barrier_trades
 except ImportError:
     import sys
     sys.path.append('..')
-    from trendline_automation import fit_trendlines_single
+    from trendline_cache import cached_fit_trendlines_rolling, DEFAULT_CACHE_DIR
+    from trade_buffer import TradeBuffer
+    from triple_barrier import barrier_trades
 
 class TrendlineBreakoutStrategy(Strategy):
     """
@@ -16,12 +20,15 @@ class TrendlineBreakoutStrategy(Strategy):
     Adaptée pour respecter l'interface Strategy modulaire.
     """
 
-    def __init__(self, lookback=72, hold_period=24, tp_mult=3.0, sl_mult=3.0, atr_lookback=168):
+    def __init__(self, lookback=72, hold_period=24, tp_mult=3.0, sl_mult=3.0, atr_lookback=168,
+                 cache_dir=DEFAULT_CACHE_DIR, n_jobs=1):
         self.lookback = lookback
         self.hold_period = hold_period
         self.tp_mult = tp_mult
         self.sl_mult = sl_mult
         self.atr_lookback = atr_lookback
+        self.cache_dir = cache_dir  # Cache disque des trendlines (None → désactivé)
+        self.n_jobs = n_jobs        # Processus pour le fit des trendlines (None → tous)
 
     def generate_dataset(self, ohlcv: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.Series]:
         assert self.atr_lookback >= self.lookback
@@ -70,77 +77,80 @@ class TrendlineBreakoutStrategy(Strategy):
                                    (close_raw - low_168) / range_168,
                                    0.5)
 
-        # ── Boucle principale ───────────────────────────────────────────────────
-        trades   = pd.DataFrame()
-        trade_i  = 0
-        in_trade = False
-        tp_price = sl_price = hp_i = None
-
-        for i in range(self.atr_lookback, len(ohlcv)):
-            window   = close[i - self.lookback: i]
-            s_coefs, r_coefs = fit_trendlines_single(window)
-            r_val    = r_coefs[1] + self.lookback * r_coefs[0]
-
-            # ── Entrée ──────────────────────────────────────────────────────────
-            if not in_trade and close[i] > r_val:
-
-                tp_price = close[i] + atr_arr[i] * self.tp_mult
-                sl_price = close[i] - atr_arr[i] * self.sl_mult
-                hp_i     = i + self.hold_period
-                in_trade = True
-
-                trades.loc[trade_i, 'entry_i']   = i
-                trades.loc[trade_i, 'entry_p']   = close[i]
-                trades.loc[trade_i, 'atr']       = atr_arr[i]
-                trades.loc[trade_i, 'sl']        = sl_price
-                trades.loc[trade_i, 'tp']        = tp_price
-                trades.loc[trade_i, 'hp_i']      = hp_i
-                trades.loc[trade_i, 'slope']     = r_coefs[0]
-                trades.loc[trade_i, 'intercept'] = r_coefs[1]
-
-                # ── Features trendline (originales) ─────────────────────────────
-                line_vals = r_coefs[1] + np.arange(self.lookback) * r_coefs[0]
-                diff      = line_vals - window
-
-                trades.loc[trade_i, 'resist_s']     = r_coefs[0] / atr_arr[i]
-                trades.loc[trade_i, 'tl_err']       = (diff.sum() / self.lookback) / atr_arr[i]
-                trades.loc[trade_i, 'max_dist']     = diff.max() / atr_arr[i]
-                trades.loc[trade_i, 'vol']          = vol_arr[i]
-                trades.loc[trade_i, 'adx']          = adx_arr[i]
+        # ── Trendlines de toutes les bougies en un seul appel ──────────────────
+        _, r_coefs_arr, _, r_vals = cached_fit_trendlines_rolling(
+            close, self.lookback, self.cache_dir, n_jobs=self.n_jobs
+        )
+
+        # ── Entrées / sorties (triple barrière, une position à la fois) ─────────
+        start    = self.atr_lookback
+        breakout = np.zeros(len(close), dtype=bool)
+        breakout[start:] = close[start:] > r_vals[start:]
+        taken = barrier_trades(close, breakout, atr_arr,
+                               self.tp_mult, self.sl_mult, self.hold_period)
+
+        # ── Features des trades retenus ─────────────────────────────────────────
+        trades   = TradeBuffer([
+            'entry_i', 'entry_p', 'atr', 'sl', 'tp', 'hp_i', 'slope', 'intercept',
+            'resist_s', 'tl_err', 'max_dist', 'vol', 'adx',
+            'breakout_size', 'n_touches',
+            'hour_sin', 'hour_cos', 'dow_sin', 'dow_cos',
+            'ret_24h', 'ret_1w', 'vol_regime', 'price_pos',
+            'exit_i', 'exit_p'
+        ])
+
+        for k, i in enumerate(taken['entry_i']):
+            r_coefs  = r_coefs_arr[i]
+            r_val    = r_vals[i]
+
+            # ── Features trendline (originales) ─────────────────────────────────
+            window    = close[i - self.lookback: i]
+            line_vals = r_coefs[1] + np.arange(self.lookback) * r_coefs[0]
+            diff      = line_vals - window
+
+            # ── Nombre de touches ────────────────────────────────────────────────
+            tolerance = atr_arr[i] * 0.5
+            n_touches = np.sum(np.abs(window - line_vals) < tolerance)
+
+            trades.append(
+                entry_i   = i,
+                entry_p   = close[i],
+                atr       = atr_arr[i],
+                sl        = taken['sl'][k],
+                tp        = taken['tp'][k],
+                hp_i      = taken['hp_i'][k],
+                slope     = r_coefs[0],
+                intercept = r_coefs[1],
+
+                resist_s  = r_coefs[0] / atr_arr[i],
+                tl_err    = (diff.sum() / self.lookback) / atr_arr[i],
+                max_dist  = diff.max() / atr_arr[i],
+                vol       = vol_arr[i],
+                adx       = adx_arr[i],
 
                 # ── Taille de la cassure ─────────────────────────────────────────
-                trades.loc[trade_i, 'breakout_size'] = (close[i] - r_val) / atr_arr[i]
+                breakout_size = (close[i] - r_val) / atr_arr[i],
+                n_touches     = n_touches,
 
-                # ── Nombre de touches ────────────────────────────────────────────
-                tolerance = atr_arr[i] * 0.5
-                n_touches = np.sum(np.abs(window - line_vals) < tolerance)
-                trades.loc[trade_i, 'n_touches']    = n_touches
+                # ── Heure / jour encodés circulairement ─────────────────────────
+                hour_sin  = hour_sin[i],
+                hour_cos  = hour_cos[i],
+                dow_sin   = dow_sin[i],
+                dow_cos   = dow_cos[i],
 
-                # ── Heure encodée circulairement ────────────────────────────────
-                trades.loc[trade_i, 'hour_sin']     = hour_sin[i]
-                trades.loc[trade_i, 'hour_cos']     = hour_cos[i]
+                # ── Momentum ─────────────────────────────────────────────────────
+                ret_24h   = ret_24[i]   if not np.isnan(ret_24[i])  else 0.0,
+                ret_1w    = ret_168[i]  if not np.isnan(ret_168[i]) else 0.0,
 
-                # ── Jour encodé circulairement ───────────────────────────────────
-                trades.loc[trade_i, 'dow_sin']      = dow_sin[i]
-                trades.loc[trade_i, 'dow_cos']      = dow_cos[i]
+                # ── Régime de volatilité / position dans le range ────────────────
+                vol_regime = vol_regime[i],
+                price_pos  = price_position[i],
 
-                # ── Momentum ─────────────────────────────────────────────────────
-                trades.loc[trade_i, 'ret_24h']      = ret_24[i]   if not np.isnan(ret_24[i])  else 0.0
-                trades.loc[trade_i, 'ret_1w']       = ret_168[i]  if not np.isnan(ret_168[i]) else 0.0
-
-                # ── Régime de volatilité ─────────────────────────────────────────
-                trades.loc[trade_i, 'vol_regime']   = vol_regime[i]
-
-                # ── Position dans le range ───────────────────────────────────────
-                trades.loc[trade_i, 'price_pos']    = price_position[i]
-
-            # ── Sortie ───────────────────────────────────────────────────────────
-            if in_trade:
-                if close[i] >= tp_price or close[i] <= sl_price or i >= hp_i:
-                    trades.loc[trade_i, 'exit_i'] = i
-                    trades.loc[trade_i, 'exit_p'] = close[i]
-                    in_trade = False
-                    trade_i += 1
+                exit_i    = taken['exit_i'][k],
+                exit_p    = taken['exit_p'][k],
+            )
+
+        trades = trades.to_frame()
 
         if len(trades) == 0:
             return pd.DataFrame(), pd.DataFrame(), pd.Series(dtype=int)
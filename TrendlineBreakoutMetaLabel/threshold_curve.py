@@ -0,0 +1,168 @@
+"""
+threshold_curve.py
+------------------
+Statistiques des trades retenus par le filtre ML (PF, win rate, rendement
+moyen, N) pour TOUS les seuils de probabilité à la fois.
+
+Les trades sont triés une fois par model_prob décroissante ; les trades
+retenus par un seuil forment alors un préfixe de ce tri, et leurs
+statistiques se lisent dans des sommes cumulées :
+  - courbe exacte : une ligne par probabilité distincte   → O(n log n)
+  - grille quelconque : searchsorted dans les probas triées → O(log n) / seuil
+
+Intervalles de confiance par bootstrap : chaque rééchantillonnage est un
+vecteur de poids (nombre de tirages de chaque trade), et les sommes de
+tous les seuils pour un bloc de rééchantillonnages sont un seul produit
+matriciel poids @ appartenance → aucune boucle Python par tirage.
+
+  curve = ThresholdCurve(trades['model_prob'], trades['return'])
+  stats = curve.at(np.arange(0.30, 0.71, 0.02))   # prob > seuil
+  full  = curve.curve()                           # prob >= chaque proba
+  bands = curve.bootstrap(np.arange(0.30, 0.71, 0.02), n_boot=5000)
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+
+# Grille de seuils de optimize_threshold
+DEFAULT_GRID = np.round(np.arange(0.30, 0.71, 0.02), 2)
+
+# Lignes de ThresholdCurve._terms
+_WINS, _LOSSES, _N_WINS, _N, _RET, _CLOSED = range(6)
+
+
+def _ratios(sums: np.array):
+    """(pf, wr, avg) à partir des sommes (6, ...) des trades retenus."""
+    wins, losses, n = sums[_WINS], sums[_LOSSES], sums[_N]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pf  = np.where(losses > 0, wins / losses, 0.0)
+        wr  = np.where(n > 0, sums[_N_WINS] / n, 0.0)
+        avg = sums[_RET] / sums[_CLOSED]
+    return pf, wr, avg
+
+
+class ThresholdCurve:
+
+    def __init__(self, probs, returns):
+        probs   = np.asarray(probs, dtype=np.float64)
+        returns = np.asarray(returns, dtype=np.float64)
+        # Trades non scorés exclus ; un trade encore ouvert (return NaN)
+        # compte dans N mais pas dans les sommes, comme avec pandas
+        keep    = ~np.isnan(probs)
+        probs, returns = probs[keep], returns[keep]
+
+        # Tri décroissant (stable) : les n premiers = les n meilleures probas
+        order = np.argsort(-probs, kind='stable')
+        self.probs = probs[order]
+        r = returns[order]
+
+        # Contribution de chaque trade aux sommes, puis sommes cumulées
+        # préfixées de 0 : colonne n → n premiers trades
+        self._terms = np.stack([
+            np.where(r > 0, r, 0.0),
+            np.where(r < 0, -r, 0.0),
+            r > 0,
+            np.ones_like(r),
+            np.nan_to_num(r),
+            ~np.isnan(r),
+        ]).astype(np.float64)
+        self._cum = np.concatenate([np.zeros((6, 1)), np.cumsum(self._terms, axis=1)], axis=1)
+
+        # Probas croissantes pour searchsorted
+        self._ascending = self.probs[::-1]
+
+    def __len__(self):
+        return len(self.probs)
+
+    def count(self, thresholds, strict: bool = True) -> np.array:
+        """Nombre de trades avec prob > seuil (strict) ou prob >= seuil."""
+        side = 'right' if strict else 'left'
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        return len(self.probs) - np.searchsorted(self._ascending, thresholds, side=side)
+
+    def stats(self, n: np.array) -> pd.DataFrame:
+        """PF / WR / rendement moyen / N des n meilleures probas."""
+        n = np.asarray(n, dtype=np.int64)
+        pf, wr, avg = _ratios(self._cum[:, n])
+        return pd.DataFrame({'pf': pf, 'wr': wr, 'avg': avg, 'n': n})
+
+    def at(self, thresholds, strict: bool = True) -> pd.DataFrame:
+        """Statistiques sur une grille de seuils quelconque (index = seuil)."""
+        df = self.stats(self.count(thresholds, strict))
+        df.index = pd.Index(np.asarray(thresholds, dtype=np.float64), name='threshold')
+        return df
+
+    def curve(self) -> pd.DataFrame:
+        """
+        Courbe exacte : une ligne par proba distincte p, trades avec prob >= p
+        (constante sur ]p précédente, p] en mode strict).
+        """
+        distinct = np.unique(self.probs)[::-1]
+        df = self.stats(self.count(distinct, strict=False))
+        df.index = pd.Index(distinct, name='threshold')
+        return df
+
+    # ── Bootstrap ───────────────────────────────────────────────────────────
+    def bootstrap(self, thresholds, n_boot: int = 5000, ci: float = 0.90,
+                  strict: bool = True, chunk: int = 1000, seed: int = 42) -> pd.DataFrame:
+        """
+        Bandes de confiance par percentiles de n_boot rééchantillonnages
+        (avec remise) des trades scorés. Colonnes <stat>_lo / _med / _hi
+        pour pf, wr et avg (index = seuil).
+        chunk : rééchantillonnages par bloc → mémoire O(chunk × trades).
+        """
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        n_trades   = len(self.probs)
+        samples    = np.full((3, n_boot, len(thresholds)), np.nan)
+
+        if n_trades > 0:
+            # (trade, seuil) : 1 si le trade est retenu par le seuil
+            member = (np.arange(n_trades)[:, None] < self.count(thresholds, strict)).astype(np.float64)
+            rng = np.random.default_rng(seed)
+
+            for lo in range(0, n_boot, chunk):
+                b = min(chunk, n_boot - lo)
+                # Poids = nombre de tirages de chaque trade dans chaque rééchantillonnage
+                draws   = rng.integers(0, n_trades, size=(b, n_trades))
+                draws  += (np.arange(b) * n_trades)[:, None]
+                weights = np.bincount(draws.ravel(), minlength=b * n_trades)
+                weights = weights.reshape(b, n_trades).astype(np.float64)
+
+                sums = np.stack([(weights * term) @ member for term in self._terms])
+                samples[:, lo:lo + b] = _ratios(sums)
+
+        q = 100 * np.array([(1 - ci) / 2, 0.5, (1 + ci) / 2])
+        with warnings.catch_warnings():
+            # Seuil sans aucun trade clôturé → avg NaN dans tous les tirages
+            warnings.simplefilter('ignore', RuntimeWarning)
+            bands = np.nanpercentile(samples, q, axis=1)     # (q, stat, seuil)
+
+        return pd.DataFrame(
+            {f'{stat}_{level}': bands[j, s]
+             for s, stat in enumerate(('pf', 'wr', 'avg'))
+             for j, level in enumerate(('lo', 'med', 'hi'))},
+            index=pd.Index(thresholds, name='threshold')
+        )
+
+
+def select_threshold(probs, returns, grid=DEFAULT_GRID, min_trades: int = 20,
+                     min_frac: float = 0.20, strict: bool = False,
+                     n_boot: int = 0, ci: float = 0.90, default: float = None):
+    """
+    Seuil de la grille maximisant le PF (n_boot > 0 → sa borne basse
+    bootstrap), parmi ceux qui retiennent au moins
+    max(min_trades, min_frac × trades scorés) trades.
+    Retourne default si aucun seuil n'est éligible ou rentable.
+    """
+    curve = ThresholdCurve(probs, returns)
+    stats = curve.at(grid, strict)
+    score = stats['pf'].to_numpy()
+    if n_boot:
+        score = curve.bootstrap(grid, n_boot=n_boot, ci=ci, strict=strict)['pf_lo'].to_numpy()
+
+    eligible = stats['n'].to_numpy() >= max(min_trades, int(len(curve) * min_frac))
+    score = np.where(eligible, score, 0.0)
+    if not np.any(score > 0):
+        return default
+    return float(stats.index[np.argmax(score)])
@@ -0,0 +1,70 @@
+"""
+trade_buffer.py
+---------------
+Buffer colonnaire pour construire la table des trades dans les boucles
+des stratégies.
+
+Écrire `trades.loc[trade_i, 'col'] = value` sur un DataFrame qui grandit
+ré-indexe / ré-alloue la table à chaque nouvelle ligne. Ici chaque colonne
+est un tableau NumPy typé pré-alloué, agrandi par doublement (coût amorti
+O(1) par trade), converti UNE seule fois en DataFrame à la fin.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class TradeBuffer:
+    """
+    trades = TradeBuffer(['entry_i', 'entry_p', 'exit_i', 'exit_p'])
+    row = trades.append(entry_i=i, entry_p=close[i])
+    trades.set(row, exit_i=j, exit_p=close[j])
+    df = trades.to_frame()
+
+    Les colonnes gardent l'ordre de déclaration. Les valeurs non renseignées
+    valent NaN (colonnes float64 par défaut, comme les DataFrames construits
+    avec .loc).
+    """
+
+    def __init__(self, columns, capacity: int = 256):
+        # columns : liste de noms (float64) ou dict {nom: dtype}
+        if not isinstance(columns, dict):
+            columns = {name: np.float64 for name in columns}
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in columns.items()}
+        self.capacity = max(1, capacity)
+        self.n = 0
+        self.data = {name: self._empty(dtype, self.capacity)
+                     for name, dtype in self.dtypes.items()}
+
+    @staticmethod
+    def _empty(dtype: np.dtype, size: int):
+        if dtype.kind == 'f':
+            return np.full(size, np.nan, dtype=dtype)
+        return np.zeros(size, dtype=dtype)
+
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        for name, arr in self.data.items():
+            grown = self._empty(arr.dtype, new_capacity)
+            grown[:self.capacity] = arr
+            self.data[name] = grown
+        self.capacity = new_capacity
+
+    def __len__(self):
+        return self.n
+
+    def append(self, **values) -> int:
+        """Ajoute une ligne et retourne son index."""
+        if self.n == self.capacity:
+            self._grow()
+        row = self.n
+        self.n += 1
+        self.set(row, **values)
+        return row
+
+    def set(self, row: int, **values):
+        for name, value in values.items():
+            self.data[name][row] = value
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({name: arr[:self.n] for name, arr in self.data.items()})
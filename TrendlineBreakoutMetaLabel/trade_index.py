@@ -0,0 +1,76 @@
+"""
+trade_index.py
+--------------
+Index des trades d'une paire pour sélectionner une fenêtre d'entraînement
+sans scanner toute la table.
+
+Les trades d'une stratégie ne se chevauchent pas (l'entrée suivante arrive
+après la sortie précédente) : entrées ET sorties sont triées. Les trades
+"ouverts après start et clôturés avant end" forment donc une plage contiguë,
+trouvée par deux searchsorted → O(log n) par fenêtre.
+
+Deux repères possibles :
+  - bougies   : entry_i / exit_i (propres à chaque paire)
+  - horodatage: date réelle d'entrée / de sortie → fenêtres cohérentes entre
+                paires cotées à des dates différentes
+"""
+
+import numpy as np
+import pandas as pd
+
+# Sortie d'un trade encore ouvert : jamais "avant end"
+_OPEN = np.iinfo(np.int64).max
+
+
+def time_key(t) -> np.int64:
+    """Horodatage → secondes depuis epoch (clé de l'index en mode temps)."""
+    return np.datetime64(pd.Timestamp(t), 's').astype(np.int64)
+
+
+class TradeIndex:
+    """
+    idx  = TradeIndex.from_trades(trades)                 # repère bougies
+    idx  = TradeIndex.from_trades(trades, ohlcv.index)    # repère temps
+    rows = idx.window(start, end)   # slice des trades entry > start, exit < end
+    x    = data_x.iloc[rows]
+    """
+
+    def __init__(self, entry_keys: np.array, exit_keys: np.array, by_time: bool = False):
+        self.entry_keys = np.asarray(entry_keys, dtype=np.int64)
+        self.exit_keys  = np.asarray(exit_keys, dtype=np.int64)
+        self.by_time    = by_time
+
+    @classmethod
+    def from_trades(cls, trades: pd.DataFrame, times: pd.DatetimeIndex = None):
+        if len(trades) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty, empty, times is not None)
+
+        exit_  = trades['exit_i'].to_numpy()
+        closed = ~np.isnan(exit_)
+        entry_keys = trades['entry_i'].to_numpy().astype(np.int64)
+        exit_keys  = np.where(closed, exit_, 0).astype(np.int64)
+
+        if times is not None:
+            secs = times.values.astype('datetime64[s]').astype(np.int64)
+            entry_keys = secs[entry_keys]
+            exit_keys  = secs[exit_keys]
+        exit_keys = np.where(closed, exit_keys, _OPEN)
+        return cls(entry_keys, exit_keys, times is not None)
+
+    def __len__(self):
+        return len(self.entry_keys)
+
+    def _key(self, t):
+        return time_key(t) if self.by_time else t
+
+    def window(self, start, end) -> slice:
+        """
+        Trades ouverts strictement après start et clôturés strictement avant
+        end (start=None → depuis le début : fenêtre expanding).
+        """
+        lo = 0
+        if start is not None:
+            lo = np.searchsorted(self.entry_keys, self._key(start), side='right')
+        hi = np.searchsorted(self.exit_keys, self._key(end), side='left')
+        return slice(int(lo), int(max(lo, hi)))
@@ -0,0 +1,197 @@
+"""
+tree_export.py
+--------------
+Export d'un méta-modèle XGBoost vers des tableaux NumPy contigus, et
+évaluateur vectorisé sans appel à XGBoost.
+
+En live on score une cassure à la fois : predict_proba sur une ligne passe
+l'essentiel de son temps dans le wrapper XGBoost (DMatrix, threads), pas
+dans le parcours des arbres. Ici tous les arbres sont aplatis dans les
+mêmes tableaux (feature, threshold, left, right, missing, value) et
+parcourus ensemble, un niveau de profondeur par itération (une seule
+ligne sans NaN : chemin rapide sur des tableaux 1-D, cf. _predict_row).
+
+  ens = export_xgboost(model)        # MetaModel, XGBClassifier ou Booster
+  ens.save('meta_model.npz')
+  ens = TreeEnsemble.load('meta_model.npz')
+  p   = ens.predict_proba(x)[:, 1]   # même résultat que model.predict_proba
+"""
+
+import json
+import numpy as np
+
+
+class TreeEnsemble:
+    """
+    Noeuds de tous les arbres, indices globaux :
+      feature   : feature testée (-1 pour une feuille)
+      threshold : seuil float32 (x < threshold → left, comme XGBoost)
+      left / right / missing : enfant gauche / droit / si x est NaN
+                  (une feuille pointe sur elle-même → parcours sans masque)
+      value     : valeur de la feuille
+      roots     : racine de chaque arbre
+    """
+
+    FIELDS = ('feature', 'threshold', 'left', 'right', 'missing', 'value', 'roots')
+
+    def __init__(self, feature, threshold, left, right, missing, value, roots,
+                 base_margin: float, max_depth: int):
+        self.feature     = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold   = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.left        = np.ascontiguousarray(left, dtype=np.int32)
+        self.right       = np.ascontiguousarray(right, dtype=np.int32)
+        self.missing     = np.ascontiguousarray(missing, dtype=np.int32)
+        self.value       = np.ascontiguousarray(value, dtype=np.float32)
+        self.roots       = np.ascontiguousarray(roots, dtype=np.int32)
+        self.base_margin = float(base_margin)
+        self.max_depth   = int(max_depth)
+        # Enfants entrelacés [left, right] : enfant = children[2 * noeud + (x >= seuil)]
+        self._children   = np.ascontiguousarray(np.column_stack([self.left, self.right]).ravel())
+
+    def __len__(self):
+        return len(self.roots)
+
+    # ── Évaluation ──────────────────────────────────────────────────────────
+    def predict_margin(self, X: np.array) -> np.array:
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        if len(X) == 1 and not np.isnan(X).any():
+            return np.array([self._predict_row(X[0])])
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        rows  = np.arange(len(X))[:, None]
+        for _ in range(self.max_depth):
+            x    = X[rows, self.feature[nodes]]     # feuilles : colonne -1, sans effet
+            step = np.where(x < self.threshold[nodes], self.left[nodes], self.right[nodes])
+            nan  = np.isnan(x)
+            if nan.any():
+                step = np.where(nan, self.missing[nodes], step)
+            nodes = step
+        return self.value[nodes].sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def _predict_row(self, x: np.array) -> float:
+        # Une ligne sans NaN (cas live) : tableaux 1-D contigus et take,
+        # un seul take sur les enfants par niveau
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            go_right = x.take(self.feature.take(nodes)) >= self.threshold.take(nodes)
+            nodes = self._children.take(2 * nodes + go_right)
+        return self.value.take(nodes).sum(dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X: np.array) -> np.array:
+        """(n, 2) comme sklearn : [P(0), P(1)]."""
+        p = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1.0 - p, p])
+
+    # ── Sauvegarde ──────────────────────────────────────────────────────────
+    def save(self, path: str):
+        np.savez(path, base_margin=self.base_margin, max_depth=self.max_depth,
+                 **{name: getattr(self, name) for name in self.FIELDS})
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as f:
+            return cls(*(f[name] for name in cls.FIELDS),
+                       base_margin=f['base_margin'], max_depth=f['max_depth'])
+
+
+def _booster(model):
+    # MetaModel → estimateur sklearn → Booster
+    model = getattr(model, 'model', model)
+    if hasattr(model, 'get_booster'):
+        model = model.get_booster()
+    if not hasattr(model, 'save_raw'):
+        raise TypeError(f"Only XGBoost models can be exported (got {type(model).__name__})")
+    return model
+
+
+def _parse_float(s: str) -> float:
+    # base_score : '4.5E-1' (XGBoost 2) ou '[4.5E-1]' (XGBoost 3)
+    return float(s.strip('[]'))
+
+
+def export_xgboost(model) -> TreeEnsemble:
+    """Aplatit les arbres d'un modèle XGBoost binary:logistic."""
+    learner = json.loads(_booster(model).save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Unsupported objective '{objective}' (expected binary:logistic)")
+
+    base_score  = _parse_float(learner['learner_model_param']['base_score'])
+    base_margin = np.log(base_score / (1.0 - base_score))
+
+    trees = learner['gradient_booster']['model']['trees']
+    feature, threshold, left, right, missing, value, roots = ([] for _ in range(7))
+    max_depth = 0
+    offset = 0
+
+    for tree in trees:
+        lc = np.array(tree['left_children'], dtype=np.int64)
+        rc = np.array(tree['right_children'], dtype=np.int64)
+        cond = np.array(tree['split_conditions'], dtype=np.float64)
+        is_leaf = lc < 0
+        own = np.arange(len(lc))
+
+        # Feuille : se pointe elle-même ; valeur de feuille dans split_conditions
+        l = np.where(is_leaf, own, lc)
+        r = np.where(is_leaf, own, rc)
+        feature.append(np.where(is_leaf, -1, tree['split_indices']))
+        threshold.append(np.where(is_leaf, 0.0, cond))
+        left.append(l + offset)
+        right.append(r + offset)
+        missing.append(np.where(np.array(tree['default_left'], dtype=bool), l, r) + offset)
+        value.append(np.where(is_leaf, cond, 0.0))
+        roots.append(offset)
+
+        # Profondeur : un niveau par parcours des parents
+        depth = np.zeros(len(lc), dtype=np.int64)
+        for k in own:
+            if not is_leaf[k]:
+                depth[lc[k]] = depth[rc[k]] = depth[k] + 1
+        max_depth = max(max_depth, int(depth.max()))
+        offset += len(lc)
+
+    return TreeEnsemble(
+        np.concatenate(feature), np.concatenate(threshold),
+        np.concatenate(left), np.concatenate(right), np.concatenate(missing),
+        np.concatenate(value), np.array(roots),
+        base_margin=base_margin, max_depth=max_depth
+    )
+
+
+def check_export(model, X: np.array, tol: float = 1e-6) -> float:
+    """Écart max entre l'export et model.predict_proba ; lève si > tol."""
+    ens  = export_xgboost(model)
+    diff = np.max(np.abs(ens.predict_proba(X)[:, 1] - model.predict_proba(X)[:, 1]))
+    if diff > tol:
+        raise AssertionError(f"Exported ensemble differs from predict_proba by {diff:.2e}")
+    return diff
+
+
+if __name__ == '__main__':
+    import os
+    import time
+    from walkforward_multi import load_pair
+    from strategies.trendline_strategy import TrendlineBreakoutStrategy
+    from meta_model import make_meta_model
+
+    strategy = TrendlineBreakoutStrategy(lookback=72, hold_period=24)
+    _, data_x, data_y = strategy.generate_dataset(load_pair('data/ETHUSDT3600.csv'))
+    X = data_x.to_numpy()
+
+    model = make_meta_model('xgboost').fit(X, data_y.to_numpy())
+    print(f"Écart max export / predict_proba : {check_export(model, X):.2e}")
+
+    ens = export_xgboost(model)
+    ens.save('meta_model_export.npz')
+    t = time.perf_counter()
+    ens = TreeEnsemble.load('meta_model_export.npz')
+    print(f"Chargement                       : {(time.perf_counter() - t) * 1e3:.2f} ms")
+    os.remove('meta_model_export.npz')
+
+    for name, predict in (('XGBoost', model.predict_proba), ('Export NumPy', ens.predict_proba)):
+        times = []
+        for k in range(500):
+            row = X[k % len(X)][None, :]
+            t = time.perf_counter()
+            predict(row)
+            times.append(time.perf_counter() - t)
+        print(f"{name:<13} 1 ligne (médiane)  : {np.median(times) * 1e6:.1f} µs")
@@ -2,6 +2,10 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
+# Version of the fit_trendlines_rolling results. Bump it whenever a change
+# alters the fitted lines, so cached trendlines (trendline_cache) are dropped.
+SOLVER_VERSION = 'exact-1'
+
 
 def check_trend_line(support: bool, pivot: int, slope: float, y: np.array):
     # compute sum of differences between line and prices, 
@@ -82,27 +86,130 @@ def optimize_slope(support: bool, pivot:int , init_slope: float, y: np.array):
     return (best_slope, -best_slope * pivot + y[pivot])
 
 
-def fit_upper_trendline(data: np.array):
+def optimize_slope_exact(support: bool, pivot: int, y: np.array):
+    # Closed-form version of optimize_slope.
+    # With the line forced through the pivot, the squared error is a
+    # parabola in the slope, and the support/resistance constraint only
+    # bounds the slope to an interval. The optimum is the unconstrained
+    # minimum clipped to that interval.
+    x = np.arange(len(y)) - pivot
+    dy = y - y[pivot]
+
+    # Unconstrained least squares slope through the pivot
+    denom = (x * x).sum()
+    best_slope = (x * dy).sum() / denom if denom > 0 else 0.0
+
+    # Slopes from the pivot to every other point bound the valid slopes.
+    # Support: line must stay under points on both sides of the pivot.
+    # Resistance: line must stay over them, so the bounds are swapped.
+    # Same 1e-5 slack as check_trend_line.
+    slack = 1e-5 if support else -1e-5
+    after = x > 0
+    before = x < 0
+    after_slopes = (dy[after] + slack) / x[after]
+    before_slopes = (dy[before] + slack) / x[before]
+    if support:
+        upper = after_slopes.min() if after_slopes.size else np.inf
+        lower = before_slopes.max() if before_slopes.size else -np.inf
+    else:
+        upper = before_slopes.min() if before_slopes.size else np.inf
+        lower = after_slopes.max() if after_slopes.size else -np.inf
+
+    best_slope = min(max(best_slope, lower), upper)
+    return (best_slope, -best_slope * pivot + y[pivot])
+
+
+def linear_fit(data: np.array):
+    # Line of best fit (least squared) in closed form, same result as
+    # np.polyfit(np.arange(len(data)), data, 1) without the lstsq overhead.
+    # Returns (slope, intercept).
+    y = np.asarray(data, dtype=float)
+    n = len(y)
+    x_mean = (n - 1) / 2.0
+    x_centered = np.arange(n) - x_mean
+    sxx = (x_centered ** 2).sum()
+    slope = (x_centered * y).sum() / sxx if sxx > 0 else 0.0
+    return (slope, y.mean() - slope * x_mean)
+
+
+def prefix_sums(data: np.array):
+    # Prefix sums of y and x*y used by rolling_linreg. Prices are taken
+    # relative to the first one to keep the sums small. Computed once and
+    # shared between lookbacks by fit_trendlines_multi.
+    y = np.asarray(data, dtype=float)
+    anchor = y[0] if len(y) else 0.0
+    y = y - anchor
+    j = np.arange(len(y))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    sum_xy = np.concatenate(([0.0], np.cumsum(j * y)))
+    return anchor, sum_y, sum_xy
+
+
+def rolling_linreg(data: np.array, lookback: int, sums: tuple = None):
+    # Line of best fit of every window data[k: k + lookback] from prefix
+    # sums of y and x*y: O(n) in total instead of one polyfit per window.
+    # Returns slopes, intercepts (one per window, len(data) - lookback + 1),
+    # in the coordinates of each window (x = 0 on its first point).
+    # sums: optional output of prefix_sums(data), to reuse across lookbacks.
+    n = len(data)
+    if n < lookback:
+        return np.empty(0), np.empty(0)
+
+    anchor, sum_y, sum_xy = prefix_sums(data) if sums is None else sums
+
+    k = np.arange(n - lookback + 1)
+    win_y = sum_y[k + lookback] - sum_y[k]
+    # sum over the window of (j - k) * y_j, x measured from window start
+    win_xy = (sum_xy[k + lookback] - sum_xy[k]) - k * win_y
+
+    x_mean = (lookback - 1) / 2.0
+    sxx = lookback * (lookback * lookback - 1) / 12.0
+    if sxx > 0:
+        slopes = (win_xy - x_mean * win_y) / sxx
+    else:
+        slopes = np.zeros(len(k))
+    intercepts = win_y / lookback - slopes * x_mean + anchor
+    return slopes, intercepts
+
+
+def find_pivots(windows: np.array, slopes: np.array, intercepts: np.array):
+    # Upper and lower pivot of a batch of windows, shape (n_windows, lookback):
+    # largest and smallest residual against each window's line of best fit.
+    x = np.arange(windows.shape[1])
+    resid = windows - (slopes[:, None] * x + intercepts[:, None])
+    return resid.argmax(axis=1), resid.argmin(axis=1)
+
+
+def _optimize(support: bool, pivot: int, init_slope: float, y: np.array, method: str):
+    if method == 'exact':
+        return optimize_slope_exact(support, pivot, y)
+    elif method == 'iterative':
+        return optimize_slope(support, pivot, init_slope, y)
+    raise ValueError(f"Unknown trendline method: {method}")
+
+
+def fit_upper_trendline(data: np.array, method: str = 'exact'):
     x = np.arange(len(data))
-    coefs = np.polyfit(x, data, 1)
+    coefs = linear_fit(data)
     line_points = coefs[0] * x + coefs[1]
     upper_pivot = (data - line_points).argmax() 
-    resist_coefs = optimize_slope(False, upper_pivot, coefs[0], data)
+    resist_coefs = _optimize(False, upper_pivot, coefs[0], data, method)
     return resist_coefs 
 
-def fit_lower_trendline(data: np.array):
+def fit_lower_trendline(data: np.array, method: str = 'exact'):
     x = np.arange(len(data))
-    coefs = np.polyfit(x, data, 1)
+    coefs = linear_fit(data)
     line_points = coefs[0] * x + coefs[1]
     lower_pivot = (data - line_points).argmin() 
-    support_coefs = optimize_slope(True, lower_pivot, coefs[0], data)
+    support_coefs = _optimize(True, lower_pivot, coefs[0], data, method)
     return support_coefs 
 
-def fit_trendlines_single(data: np.array):
+def fit_trendlines_single(data: np.array, method: str = 'exact'):
     # find line of best fit (least squared) 
     # coefs[0] = slope,  coefs[1] = intercept 
+    # method: 'exact' (closed form) or 'iterative' (original step search)
     x = np.arange(len(data))
-    coefs = np.polyfit(x, data, 1)
+    coefs = linear_fit(data)
 
     # Get points of line.
     line_points = coefs[0] * x + coefs[1]
@@ -112,27 +219,149 @@ def fit_trendlines_single(data: np.array):
     lower_pivot = (data - line_points).argmin() 
    
     # Optimize the slope for both trend lines
-    support_coefs = optimize_slope(True, lower_pivot, coefs[0], data)
-    resist_coefs = optimize_slope(False, upper_pivot, coefs[0], data)
+    support_coefs = _optimize(True, lower_pivot, coefs[0], data, method)
+    resist_coefs = _optimize(False, upper_pivot, coefs[0], data, method)
 
     return (support_coefs, resist_coefs) 
 
 
 
-def fit_trendlines_high_low(high: np.array, low: np.array, close: np.array):
+def fit_trendlines_high_low(high: np.array, low: np.array, close: np.array, method: str = 'exact'):
     x = np.arange(len(close))
-    coefs = np.polyfit(x, close, 1)
+    coefs = linear_fit(close)
     # coefs[0] = slope,  coefs[1] = intercept
     line_points = coefs[0] * x + coefs[1]
     upper_pivot = (high - line_points).argmax() 
     lower_pivot = (low - line_points).argmin() 
     
-    support_coefs = optimize_slope(True, lower_pivot, coefs[0], low)
-    resist_coefs = optimize_slope(False, upper_pivot, coefs[0], high)
+    support_coefs = _optimize(True, lower_pivot, coefs[0], low, method)
+    resist_coefs = _optimize(False, upper_pivot, coefs[0], high, method)
 
     return (support_coefs, resist_coefs)
 
 
+def _optimize_slope_exact_batch(support: bool, pivots: np.array, windows: np.array):
+    # optimize_slope_exact applied to every row of a (n_windows, lookback)
+    # array at once. pivots holds one pivot index per row.
+    rows = np.arange(len(windows))
+    x = np.arange(windows.shape[1])[None, :] - pivots[:, None]
+    pivot_vals = windows[rows, pivots]
+    dy = windows - pivot_vals[:, None]
+
+    denom = (x * x).sum(axis=1)
+    num = (x * dy).sum(axis=1)
+    best_slope = np.divide(num, denom, out=np.zeros(len(windows)), where=denom > 0)
+
+    slack = 1e-5 if support else -1e-5
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (dy + slack) / x
+    after_slopes_min = np.where(x > 0, slopes, np.inf).min(axis=1)
+    after_slopes_max = np.where(x > 0, slopes, -np.inf).max(axis=1)
+    before_slopes_min = np.where(x < 0, slopes, np.inf).min(axis=1)
+    before_slopes_max = np.where(x < 0, slopes, -np.inf).max(axis=1)
+    if support:
+        upper, lower = after_slopes_min, before_slopes_max
+    else:
+        upper, lower = before_slopes_min, after_slopes_max
+
+    best_slope = np.minimum(np.maximum(best_slope, lower), upper)
+    return best_slope, -best_slope * pivots + pivot_vals
+
+
+def fit_trendlines_rolling(close: np.array, lookback: int, chunk_size: int = None,
+                           sums: tuple = None, start: int = None, end: int = None):
+    # Support/resistance lines for every bar of the series in one call.
+    # Row i is fitted on close[i - lookback: i] (the window does NOT
+    # include bar i), exactly like the per-bar loops of the callers,
+    # and uses the exact solver. Rows before lookback are NaN.
+    # Windows are processed in chunks of chunk_size rows to bound memory.
+    # sums: optional prefix_sums(close[:-1]), shared between lookbacks.
+    # start/end: only fit bars in [start, end), other rows stay NaN. Each row
+    # only depends on its own window, so a range is bit-identical to the
+    # same rows of a full fit (used by parallel_trendlines).
+    #
+    # Returns s_coefs, r_coefs (n, 2) arrays of [slope, intercept] and
+    # s_vals, r_vals, the lines projected forward to bar i.
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    s_coefs = np.full((n, 2), np.nan)
+    r_coefs = np.full((n, 2), np.nan)
+    if n <= lookback:
+        return s_coefs, r_coefs, s_coefs[:, 0].copy(), r_coefs[:, 0].copy()
+
+    if chunk_size is None:
+        chunk_size = max(1, 2_000_000 // lookback)
+
+    # windows[k] = close[k: k + lookback], used for bar k + lookback
+    windows = np.lib.stride_tricks.sliding_window_view(close[:-1], lookback)
+    slopes, intercepts = rolling_linreg(close[:-1], lookback, sums)
+
+    first = max(lookback, 0 if start is None else start) - lookback
+    last = min(n, n if end is None else end) - lookback
+    for k in range(first, last, chunk_size):
+        k_end = min(k + chunk_size, last)
+        w = windows[k: k_end]
+        upper_pivot, lower_pivot = find_pivots(w, slopes[k: k_end], intercepts[k: k_end])
+
+        rows = slice(k + lookback, k_end + lookback)
+        s_coefs[rows, 0], s_coefs[rows, 1] = _optimize_slope_exact_batch(True, lower_pivot, w)
+        r_coefs[rows, 0], r_coefs[rows, 1] = _optimize_slope_exact_batch(False, upper_pivot, w)
+
+    # Current value of the lines, projected forward to bar i
+    s_vals = s_coefs[:, 1] + lookback * s_coefs[:, 0]
+    r_vals = r_coefs[:, 1] + lookback * r_coefs[:, 0]
+    return s_coefs, r_coefs, s_vals, r_vals
+
+
+def fit_trendlines_multi(close: np.array, lookbacks: list, chunk_size: int = None):
+    # fit_trendlines_rolling for several lookbacks at once, for parameter
+    # sweeps. The prefix sums are computed once for all lookbacks and the
+    # windows are zero-copy views of the same array.
+    #
+    # Returns s_vals, r_vals of shape (len(lookbacks), len(close)):
+    # row k holds the projected lines of lookbacks[k].
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    s_vals = np.full((len(lookbacks), n), np.nan)
+    r_vals = np.full((len(lookbacks), n), np.nan)
+    if n < 2:
+        return s_vals, r_vals
+
+    sums = prefix_sums(close[:-1])
+    for k, lookback in enumerate(lookbacks):
+        _, _, s_vals[k], r_vals[k] = fit_trendlines_rolling(close, lookback, chunk_size, sums)
+    return s_vals, r_vals
+
+
+def compare_trendline_methods(data: np.array, lookback: int, tol: float = 1e-6):
+    # Tolerance check of the exact solver against the iterative optimizer,
+    # over every window of the series. The exact line must be valid and its
+    # squared error must never exceed the iterative one by more than tol
+    # (relative). Returns the worst relative error gap and slope difference.
+    x = np.arange(lookback)
+    worst_gap = -np.inf
+    worst_slope = 0.0
+    for i in range(lookback, len(data) + 1):
+        window = data[i - lookback: i]
+        exact = fit_trendlines_single(window, method='exact')
+        iterative = fit_trendlines_single(window, method='iterative')
+        for support, e, it in zip((True, False), exact, iterative):
+            e_diffs = e[0] * x + e[1] - window
+            it_diffs = it[0] * x + it[1] - window
+            if support:
+                assert e_diffs.max() <= 1e-5 + 1e-9, f"Invalid exact support at bar {i}"
+            else:
+                assert e_diffs.min() >= -1e-5 - 1e-9, f"Invalid exact resistance at bar {i}"
+
+            e_err = (e_diffs ** 2).sum()
+            it_err = (it_diffs ** 2).sum()
+            gap = (e_err - it_err) / max(it_err, 1e-12)
+            assert gap <= tol, f"Exact error above iterative at bar {i}: {gap}"
+            worst_gap = max(worst_gap, gap)
+            worst_slope = max(worst_slope, abs(e[0] - it[0]))
+    return worst_gap, worst_slope
+
+
 if __name__ == '__main__':
 
     # Load data
@@ -145,6 +374,10 @@ if __name__ == '__main__':
     # Trendline parameter
     lookback = 30
 
+    # Sanity check of the exact solver against the iterative optimizer
+    gap, slope_diff = compare_trendline_methods(data['close'].to_numpy(), lookback)
+    print(f"Exact vs iterative: max error gap {gap:.2e}, max slope diff {slope_diff:.2e}")
+
 
     support_slope = [np.nan] * len(data)
     resist_slope = [np.nan] * len(data)
@@ -1,13 +1,17 @@
 import numpy as np
 import pandas as pd
 import pandas_ta as ta
-from trendline_automation import fit_trendlines_single
+from trendline_cache import cached_fit_trendlines_rolling, DEFAULT_CACHE_DIR
+from trade_buffer import TradeBuffer
+from triple_barrier import barrier_trades
 
 
 def trendline_breakout_dataset(
         ohlcv: pd.DataFrame, lookback: int,
         hold_period: int = 12, tp_mult: float = 3.0, sl_mult: float = 3.0,
-        atr_lookback: int = 168
+        atr_lookback: int = 168,
+        cache_dir: str = DEFAULT_CACHE_DIR,  # None → pas de cache disque
+        n_jobs: int = 1                      # Processus pour le fit (None → tous)
 ):
     assert atr_lookback >= lookback
 
@@ -58,77 +62,78 @@ def trendline_breakout_dataset(
                                (close_raw - low_168) / range_168,
                                0.5)
 
-    # ── Boucle principale ───────────────────────────────────────────────────
-    trades   = pd.DataFrame()
-    trade_i  = 0
-    in_trade = False
-    tp_price = sl_price = hp_i = None
-
-    for i in range(atr_lookback, len(ohlcv)):
-        window   = close[i - lookback: i]
-        s_coefs, r_coefs = fit_trendlines_single(window)
-        r_val    = r_coefs[1] + lookback * r_coefs[0]
-
-        # ── Entrée ──────────────────────────────────────────────────────────
-        if not in_trade and close[i] > r_val:
-
-            tp_price = close[i] + atr_arr[i] * tp_mult
-            sl_price = close[i] - atr_arr[i] * sl_mult
-            hp_i     = i + hold_period
-            in_trade = True
-
-            trades.loc[trade_i, 'entry_i']   = i
-            trades.loc[trade_i, 'entry_p']   = close[i]
-            trades.loc[trade_i, 'atr']       = atr_arr[i]
-            trades.loc[trade_i, 'sl']        = sl_price
-            trades.loc[trade_i, 'tp']        = tp_price
-            trades.loc[trade_i, 'hp_i']      = i + hold_period
-            trades.loc[trade_i, 'slope']     = r_coefs[0]
-            trades.loc[trade_i, 'intercept'] = r_coefs[1]
-
-            # ── Features trendline (originales) ─────────────────────────────
-            line_vals = r_coefs[1] + np.arange(lookback) * r_coefs[0]
-            diff      = line_vals - window
-
-            trades.loc[trade_i, 'resist_s']     = r_coefs[0] / atr_arr[i]
-            trades.loc[trade_i, 'tl_err']       = (diff.sum() / lookback) / atr_arr[i]
-            trades.loc[trade_i, 'max_dist']     = diff.max() / atr_arr[i]
-            trades.loc[trade_i, 'vol']          = vol_arr[i]
-            trades.loc[trade_i, 'adx']          = adx_arr[i]
+    # ── Trendlines de toutes les bougies en un seul appel ──────────────────
+    _, r_coefs_arr, _, r_vals = cached_fit_trendlines_rolling(
+        close, lookback, cache_dir, n_jobs=n_jobs
+    )
 
-            # ── Taille de la cassure ─────────────────────────────────────────
-            trades.loc[trade_i, 'breakout_size'] = (close[i] - r_val) / atr_arr[i]
+    # ── Entrées / sorties (triple barrière, une position à la fois) ─────────
+    breakout = np.zeros(len(close), dtype=bool)
+    breakout[atr_lookback:] = close[atr_lookback:] > r_vals[atr_lookback:]
+    taken = barrier_trades(close, breakout, atr_arr, tp_mult, sl_mult, hold_period)
 
-            # ── Nombre de touches ────────────────────────────────────────────
-            tolerance = atr_arr[i] * 0.5
-            n_touches = np.sum(np.abs(window - line_vals) < tolerance)
-            trades.loc[trade_i, 'n_touches']    = n_touches
+    # ── Features des trades retenus ─────────────────────────────────────────
+    trades   = TradeBuffer([
+        'entry_i', 'entry_p', 'atr', 'sl', 'tp', 'hp_i', 'slope', 'intercept',
+        'resist_s', 'tl_err', 'max_dist', 'vol', 'adx',
+        'breakout_size', 'n_touches',
+        'hour_sin', 'hour_cos', 'dow_sin', 'dow_cos',
+        'ret_24h', 'ret_1w', 'vol_regime', 'price_pos',
+        'exit_i', 'exit_p'
+    ])
+
+    for k, i in enumerate(taken['entry_i']):
+        r_coefs  = r_coefs_arr[i]
+        r_val    = r_vals[i]
+
+        # ── Features trendline (originales) ─────────────────────────────────
+        window    = close[i - lookback: i]
+        line_vals = r_coefs[1] + np.arange(lookback) * r_coefs[0]
+        diff      = line_vals - window
+
+        # ── Nombre de touches ────────────────────────────────────────────────
+        tolerance = atr_arr[i] * 0.5
+        n_touches = np.sum(np.abs(window - line_vals) < tolerance)
+
+        trades.append(
+            entry_i   = i,
+            entry_p   = close[i],
+            atr       = atr_arr[i],
+            sl        = taken['sl'][k],
+            tp        = taken['tp'][k],
+            hp_i      = taken['hp_i'][k],
+            slope     = r_coefs[0],
+            intercept = r_coefs[1],
+
+            resist_s  = r_coefs[0] / atr_arr[i],
+            tl_err    = (diff.sum() / lookback) / atr_arr[i],
+            max_dist  = diff.max() / atr_arr[i],
+            vol       = vol_arr[i],
+            adx       = adx_arr[i],
 
-            # ── Heure encodée circulairement ────────────────────────────────
-            trades.loc[trade_i, 'hour_sin']     = hour_sin[i]
-            trades.loc[trade_i, 'hour_cos']     = hour_cos[i]
+            # ── Taille de la cassure ─────────────────────────────────────────
+            breakout_size = (close[i] - r_val) / atr_arr[i],
+            n_touches     = n_touches,
 
-            # ── Jour encodé circulairement ───────────────────────────────────
-            trades.loc[trade_i, 'dow_sin']      = dow_sin[i]
-            trades.loc[trade_i, 'dow_cos']      = dow_cos[i]
+            # ── Heure / jour encodés circulairement ─────────────────────────
+            hour_sin  = hour_sin[i],
+            hour_cos  = hour_cos[i],
+            dow_sin   = dow_sin[i],
+            dow_cos   = dow_cos[i],
 
             # ── Momentum ─────────────────────────────────────────────────────
-            trades.loc[trade_i, 'ret_24h']      = ret_24[i]   if not np.isnan(ret_24[i])  else 0.0
-            trades.loc[trade_i, 'ret_1w']       = ret_168[i]  if not np.isnan(ret_168[i]) else 0.0
-
-            # ── Régime de volatilité ─────────────────────────────────────────
-            trades.loc[trade_i, 'vol_regime']   = vol_regime[i]
-
-            # ── Position dans le range ───────────────────────────────────────
-            trades.loc[trade_i, 'price_pos']    = price_position[i]
-
-        # ── Sortie ───────────────────────────────────────────────────────────
-        if in_trade:
-            if close[i] >= tp_price or close[i] <= sl_price or i >= hp_i:
-                trades.loc[trade_i, 'exit_i'] = i
-                trades.loc[trade_i, 'exit_p'] = close[i]
-                in_trade = False
-                trade_i += 1
+            ret_24h   = ret_24[i]   if not np.isnan(ret_24[i])  else 0.0,
+            ret_1w    = ret_168[i]  if not np.isnan(ret_168[i]) else 0.0,
+
+            # ── Régime de volatilité / position dans le range ────────────────
+            vol_regime = vol_regime[i],
+            price_pos  = price_position[i],
+
+            exit_i    = taken['exit_i'][k],
+            exit_p    = taken['exit_p'][k],
+        )
+
+    trades = trades.to_frame()
 
     trades['return'] = trades['exit_p'] - trades['entry_p']
 
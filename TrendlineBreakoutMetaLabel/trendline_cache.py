@@ -0,0 +1,126 @@
+"""
+trendline_cache.py
+------------------
+Cache disque des trendlines (fit_trendlines_rolling).
+
+Chaque série de coefficients support / résistance est stockée dans un
+fichier .npy, chargé en memory-map, et adressé par son contenu :
+  hash(close) + lookback + SOLVER_VERSION
+→ relancer un script sur les mêmes données saute entièrement le fit.
+
+  - Éviction LRU quand la taille totale dépasse max_bytes
+  - Invalidation : les fichiers d'une autre version du solveur sont supprimés
+"""
+
+import hashlib
+import os
+import tempfile
+import numpy as np
+from trendline_automation import SOLVER_VERSION
+from parallel_trendlines import fit_trendlines_parallel
+
+DEFAULT_CACHE_DIR = '.trendline_cache'
+DEFAULT_MAX_BYTES = 1 << 30   # 1 Go
+
+
+class TrendlineCache:
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._purge_old_versions()
+
+    # ── Clés / fichiers ─────────────────────────────────────────────────────
+    @staticmethod
+    def fingerprint(close: np.array) -> str:
+        close = np.ascontiguousarray(close, dtype=np.float64)
+        return hashlib.sha1(close.tobytes()).hexdigest()
+
+    def path(self, close: np.array, lookback: int) -> str:
+        name = f"{SOLVER_VERSION}_{lookback}_{self.fingerprint(close)}.npy"
+        return os.path.join(self.cache_dir, name)
+
+    def _entries(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npy'):
+                yield os.path.join(self.cache_dir, name)
+
+    def _purge_old_versions(self):
+        prefix = SOLVER_VERSION + '_'
+        for path in self._entries():
+            if not os.path.basename(path).startswith(prefix):
+                os.remove(path)
+
+    def _evict(self, keep: str = None):
+        """Éviction LRU ; keep (l'entrée qui vient d'être écrite) n'est jamais supprimée."""
+        entries = []
+        for path in self._entries():
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:   # supprimé entre-temps par un autre process
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        # Le moins récemment utilisé en premier (mtime mis à jour à chaque hit)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    # ── Lecture / écriture ──────────────────────────────────────────────────
+    def get(self, close: np.array, lookback: int):
+        """Retourne (s_coefs, r_coefs) en memory-map, ou None si absent."""
+        path = self.path(close, lookback)
+        if not os.path.exists(path):
+            return None
+        coefs = np.load(path, mmap_mode='r')
+        os.utime(path)
+        return coefs[:, 0:2], coefs[:, 2:4]
+
+    def put(self, close: np.array, lookback: int, s_coefs: np.array, r_coefs: np.array):
+        path = self.path(close, lookback)
+        # Fichier temporaire unique : plusieurs process peuvent écrire la même entrée
+        f = tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix='.tmp', delete=False)
+        try:
+            with f:
+                np.save(f, np.hstack([s_coefs, r_coefs]))
+            os.replace(f.name, path)
+        except BaseException:
+            if os.path.exists(f.name):
+                os.remove(f.name)
+            raise
+        self._evict(keep=path)
+
+    def fit_trendlines_rolling(self, close: np.array, lookback: int, n_jobs: int = 1):
+        """Même sortie que trendline_automation.fit_trendlines_rolling."""
+        close = np.asarray(close, dtype=float)
+        cached = self.get(close, lookback)
+        if cached is None:
+            s_coefs, r_coefs, _, _ = fit_trendlines_parallel(close, lookback, n_jobs)
+            self.put(close, lookback, s_coefs, r_coefs)
+        else:
+            s_coefs, r_coefs = cached
+
+        s_vals = s_coefs[:, 1] + lookback * s_coefs[:, 0]
+        r_vals = r_coefs[:, 1] + lookback * r_coefs[:, 0]
+        return s_coefs, r_coefs, s_vals, r_vals
+
+
+def cached_fit_trendlines_rolling(close: np.array, lookback: int,
+                                  cache_dir: str = DEFAULT_CACHE_DIR,
+                                  max_bytes: int = DEFAULT_MAX_BYTES,
+                                  n_jobs: int = 1):
+    """
+    fit_trendlines_rolling avec cache disque (cache_dir=None → sans cache).
+    En cas de miss, le fit tourne sur n_jobs processus (None → tous les cœurs).
+    """
+    if cache_dir is None:
+        return fit_trendlines_parallel(close, lookback, n_jobs)
+    return TrendlineCache(cache_dir, max_bytes).fit_trendlines_rolling(close, lookback, n_jobs)
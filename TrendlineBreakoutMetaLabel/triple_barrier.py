@@ -0,0 +1,365 @@
+"""
+triple_barrier.py
+-----------------
+Moteur de sortie triple barrière (TP / SL / hold period), vectorisé.
+
+Pour chaque entrée, la sortie est la première bougie j >= start telle que
+  close[j] >= tp   ou   close[j] <= sl   ou   j >= end
+(même test que les boucles des stratégies). Toutes les entrées avancent
+ensemble, par blocs de `chunk` bougies, en opérations NumPy : la boucle
+Python tourne ~hold / chunk fois au lieu d'une fois par bougie.
+
+La règle "une seule position à la fois" se résume ensuite à parcourir les
+sorties pré-calculées (walk_trades) → O(trades) en Python au lieu de O(bougies).
+
+label_matrix évalue plusieurs configurations (tp_mult, sl_mult, hold_period)
+sur les mêmes entrées, en un seul appel au moteur.
+
+FirstPassageIndex pré-calcule, pour chaque bougie, le max / min courant de
+close sur un horizon maximal : une sortie triple barrière devient une
+recherche dichotomique dans ces chemins, O(log hold) par requête. Toutes les
+fonctions ci-dessous acceptent un index (index=...) à réutiliser entre
+plusieurs appels sur la même série.
+
+barrier_grid fait de même pour une grille de stratégies "entrée sur signal" :
+les temps de premier passage de chaque niveau de TP / SL distinct sont lus
+dans l'index, puis chaque configuration se réduit à un min(TP, SL, hold)
+vectorisé et à sa propre passe walk_trades.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Raison de sortie
+EXIT_OPEN = 0   # aucune barrière touchée avant la fin des données
+EXIT_TP   = 1
+EXIT_SL   = 2
+EXIT_TIME = 3
+
+
+def triple_barrier_exits(close: np.array, start_i: np.array,
+                         tp: np.array, sl: np.array, end_i: np.array,
+                         chunk: int = 32):
+    """
+    Retourne (exit_i, exit_p, reason) pour chaque entrée.
+    exit_i / exit_p valent NaN si le trade est encore ouvert en fin de série.
+    Un TP / SL NaN n'est jamais touché (comme dans les boucles).
+    """
+    close   = np.asarray(close, dtype=float)
+    n       = len(close)
+    start_i = np.asarray(start_i, dtype=np.int64)
+    m       = len(start_i)
+    tp      = np.broadcast_to(np.asarray(tp, dtype=float), (m,))
+    sl      = np.broadcast_to(np.asarray(sl, dtype=float), (m,))
+    end_i   = np.broadcast_to(np.asarray(end_i, dtype=np.int64), (m,))
+
+    exit_i = np.full(m, np.nan)
+    reason = np.full(m, EXIT_OPEN, dtype=np.int8)
+    if m == 0 or n == 0:
+        return exit_i, np.full(m, np.nan), reason
+
+    offsets = np.arange(chunk)
+    pos     = start_i.copy()
+    pending = np.arange(m)
+
+    while len(pending):
+        idx    = pos[pending, None] + offsets               # (pending, chunk)
+        inside = idx < n
+        c      = close[np.minimum(idx, n - 1)]
+
+        hit_tp = inside & (c >= tp[pending, None])
+        hit_sl = inside & (c <= sl[pending, None])
+        hit_hp = inside & (idx >= end_i[pending, None])
+        hit    = hit_tp | hit_sl | hit_hp
+
+        found = hit.any(axis=1)
+        rows  = np.flatnonzero(found)
+        first = hit[rows].argmax(axis=1)
+        done  = pending[rows]
+
+        exit_i[done] = idx[rows, first]
+        # Même priorité que les boucles : TP, puis SL, puis temps
+        reason[done] = np.where(hit_tp[rows, first], EXIT_TP,
+                       np.where(hit_sl[rows, first], EXIT_SL, EXIT_TIME))
+
+        # Les entrées sans sortie avancent d'un bloc tant qu'il reste des bougies
+        pending = pending[~found & (idx[:, -1] < n - 1)]
+        pos[pending] += chunk
+
+    exit_p = np.full(m, np.nan)
+    closed = ~np.isnan(exit_i)
+    exit_p[closed] = close[exit_i[closed].astype(np.int64)]
+    return exit_i, exit_p, reason
+
+
+class FirstPassageIndex:
+    """
+    Index des premiers passages depuis n'importe quelle bougie.
+
+    Pour chaque bougie i, stocke le max et le min courants de close sur
+    [i, i + d], d = 0..max_hold (deux tableaux (n, max_hold + 1), ~16 octets
+    par bougie et par décalage). Ces chemins sont monotones en d : la
+    première bougie où close >= tp (ou <= sl) se trouve par recherche
+    dichotomique → O(log max_hold) par requête, toutes les requêtes avancent
+    ensemble en NumPy.
+
+      index = FirstPassageIndex(close, max_hold=72)
+      exit_i, exit_p, reason = index.exits(start_i, tp, sl, end_i)
+
+    Même résultat que triple_barrier_exits ; une requête dont le hold
+    dépasse max_hold est déléguée à triple_barrier_exits.
+    """
+
+    def __init__(self, close: np.array, max_hold: int):
+        self.close    = np.asarray(close, dtype=float)
+        self.max_hold = int(max_hold)
+        n, width = len(self.close), self.max_hold + 1
+
+        # Au-delà de la série : valeur neutre pour le max / min courant
+        def paths(pad):
+            padded = np.concatenate([self.close, np.full(width, pad)])
+            return np.lib.stride_tricks.sliding_window_view(padded, width)[:n]
+        self.run_max = np.maximum.accumulate(paths(-np.inf), axis=1)
+        self.run_min = np.minimum.accumulate(paths(np.inf), axis=1)
+
+    def __len__(self):
+        return len(self.close)
+
+    def first_passage(self, start_i: np.array, levels: np.array, upward: bool = True) -> np.array:
+        """
+        Premier décalage d ∈ [0, max_hold] tel que close[start_i + d] >= level
+        (upward) ou <= level ; max_hold + 1 si jamais touché dans la fenêtre
+        ou avant la fin de la série. levels : même forme que start_i, ou
+        (len(start_i), n_levels) pour plusieurs niveaux par départ.
+        """
+        levels  = np.asarray(levels, dtype=float)
+        start_i = np.asarray(start_i, dtype=np.int64)
+        if levels.ndim == 2:
+            start_i = start_i[:, None]
+        start_i, levels = np.broadcast_arrays(start_i, levels)
+        shape = levels.shape
+        start_i, levels = start_i.ravel(), levels.ravel()
+
+        n, width = len(self.close), self.max_hold + 1
+        times = np.full(len(levels), width, dtype=np.int64)
+        ok    = (start_i < n) & ~np.isnan(levels)
+        rows, target = start_i[ok], levels[ok]
+        extreme = self.run_max if upward else self.run_min
+
+        # Recherche dichotomique ligne par ligne, vectorisée
+        lo = np.zeros(len(rows), dtype=np.int64)
+        hi = np.full(len(rows), width, dtype=np.int64)
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            mid = (lo + hi) // 2
+            v   = extreme[rows, np.minimum(mid, width - 1)]
+            before = (v < target) if upward else (v > target)
+            lo = np.where(active & before, mid + 1, lo)
+            hi = np.where(active & ~before, mid, hi)
+
+        times[ok] = lo
+        return times.reshape(shape)
+
+    def exits(self, start_i: np.array, tp: np.array, sl: np.array, end_i: np.array):
+        """Comme triple_barrier_exits(close, start_i, tp, sl, end_i)."""
+        n       = len(self.close)
+        start_i = np.asarray(start_i, dtype=np.int64)
+        m       = len(start_i)
+        tp      = np.broadcast_to(np.asarray(tp, dtype=float), (m,))
+        sl      = np.broadcast_to(np.asarray(sl, dtype=float), (m,))
+        end_i   = np.broadcast_to(np.asarray(end_i, dtype=np.int64), (m,))
+
+        hold = np.maximum(end_i - start_i, 0)
+        long = hold > self.max_hold
+        t_tp = self.first_passage(start_i, tp, upward=True)
+        t_sl = self.first_passage(start_i, sl, upward=False)
+
+        # Même priorité que les boucles : TP, puis SL, puis temps
+        d      = np.minimum(np.minimum(t_tp, t_sl), hold)
+        exit_i = start_i + d
+        opened = exit_i >= n
+        reason = np.where(opened, EXIT_OPEN,
+                 np.where(t_tp == d, EXIT_TP, np.where(t_sl == d, EXIT_SL, EXIT_TIME))).astype(np.int8)
+        exit_i = np.where(opened, np.nan, exit_i)
+
+        if long.any():
+            exit_i[long], _, reason[long] = triple_barrier_exits(
+                self.close, start_i[long], tp[long], sl[long], end_i[long])
+
+        exit_p = np.full(m, np.nan)
+        closed = ~np.isnan(exit_i)
+        exit_p[closed] = self.close[exit_i[closed].astype(np.int64)]
+        return exit_i, exit_p, reason
+
+
+def _exits(close: np.array, index):
+    """
+    exits(start_i, tp, sl, end_i) : par l'index s'il est fourni (construit
+    sur la même série close), sinon par blocs.
+    """
+    if index is not None:
+        return index.exits
+    return lambda start_i, tp, sl, end_i: triple_barrier_exits(close, start_i, tp, sl, end_i)
+
+
+def walk_trades(entry_i: np.array, exit_i: np.array, reentry_same_bar: bool = False):
+    """
+    Sélectionne les trades pris une position à la fois parmi des entrées
+    candidates triées (entry_i croissant) dont la sortie est déjà connue.
+
+    reentry_same_bar=False : l'entrée est testée avant la sortie (datasets),
+                             la prochaine entrée arrive après la bougie de sortie.
+    reentry_same_bar=True  : la sortie est testée avant l'entrée (walk-forward).
+    Retourne les positions (dans entry_i) des trades retenus.
+    """
+    entry_i = np.asarray(entry_i)
+    exit_i  = np.asarray(exit_i, dtype=float)
+    free_at = exit_i if reentry_same_bar else exit_i + 1
+
+    # Entrée suivante possible après chaque candidate (vectorisé) ; un trade
+    # encore ouvert (sortie NaN) renvoie après la fin → plus aucune entrée
+    nxt = np.searchsorted(entry_i, free_at, side='left')
+    nxt = np.maximum(nxt, np.arange(1, len(nxt) + 1)).tolist()
+    taken = []
+    k = 0
+    while k < len(nxt):
+        taken.append(k)
+        k = nxt[k]
+    return np.array(taken, dtype=np.int64)
+
+
+def barrier_trades(close: np.array, signal: np.array, atr: np.array,
+                   tp_mult: float, sl_mult: float, hold_period: int,
+                   index: FirstPassageIndex = None):
+    """
+    Trades d'une stratégie "entrée sur signal, sortie triple barrière",
+    une position à la fois, entrée testée avant la sortie (y compris sur
+    la bougie d'entrée) — la logique des générateurs de dataset.
+
+    Retourne un dict de tableaux alignés sur les trades retenus :
+    entry_i, tp, sl, hp_i, exit_i, exit_p, reason.
+    """
+    close = np.asarray(close, dtype=float)
+    entry = np.flatnonzero(signal)
+
+    tp    = close[entry] + atr[entry] * tp_mult
+    sl    = close[entry] - atr[entry] * sl_mult
+    hp_i  = entry + hold_period
+    exit_i, exit_p, reason = _exits(close, index)(entry, tp, sl, hp_i)
+
+    k = walk_trades(entry, exit_i)
+    return {
+        'entry_i': entry[k], 'tp': tp[k], 'sl': sl[k], 'hp_i': hp_i[k],
+        'exit_i': exit_i[k], 'exit_p': exit_p[k], 'reason': reason[k],
+    }
+
+
+def barrier_grid(close: np.array, signal: np.array, atr: np.array,
+                 configs: list, chunk: int = 256, index: FirstPassageIndex = None):
+    """
+    barrier_trades pour chaque configuration [(tp_mult, sl_mult, hold_period), ...]
+    sur les mêmes entrées candidates. Génère (config, trades) dans l'ordre
+    de configs, trades ayant la même forme que barrier_trades.
+    index : FirstPassageIndex de close à réutiliser (max_hold >= plus long hold).
+    """
+    close = np.asarray(close, dtype=float)
+    n     = len(close)
+    entry = np.flatnonzero(signal)
+    tp_mult, sl_mult, hold = (np.array(v) for v in zip(*configs))
+    hold = hold.astype(np.int64)
+
+    # Premiers passages, une colonne par niveau distinct
+    tp_levels, tp_col = np.unique(tp_mult, return_inverse=True)
+    sl_levels, sl_col = np.unique(sl_mult, return_inverse=True)
+    tp_price = close[entry, None] + atr[entry, None] * tp_levels
+    sl_price = close[entry, None] - atr[entry, None] * sl_levels
+    if index is None or index.max_hold < hold.max():
+        index = FirstPassageIndex(close, int(hold.max()))
+    t_tp = index.first_passage(entry, tp_price, upward=True)
+    t_sl = index.first_passage(entry, sl_price, upward=False)
+
+    for lo in range(0, len(configs), chunk):
+        block = slice(lo, lo + chunk)
+        # Sortie de chaque (entrée, configuration) : même priorité TP, SL, temps
+        a, b = t_tp[:, tp_col[block]], t_sl[:, sl_col[block]]
+        d    = np.minimum(np.minimum(a, b), hold[block])
+        exit_all = entry[:, None] + d
+        opened   = exit_all >= n
+        reason_all = np.where(opened, EXIT_OPEN,
+                     np.where(a == d, EXIT_TP, np.where(b == d, EXIT_SL, EXIT_TIME)))
+        exit_all = np.where(opened, np.nan, exit_all)
+
+        for j, c in enumerate(range(*block.indices(len(configs)))):
+            exit_i = exit_all[:, j]
+            k      = walk_trades(entry, exit_i)
+            closed = ~np.isnan(exit_i[k])
+            exit_p = np.full(len(k), np.nan)
+            exit_p[closed] = close[exit_i[k][closed].astype(np.int64)]
+            yield configs[c], {
+                'entry_i': entry[k],
+                'tp': tp_price[k, tp_col[c]], 'sl': sl_price[k, sl_col[c]],
+                'hp_i': entry[k] + hold[c],
+                'exit_i': exit_i[k], 'exit_p': exit_p,
+                'reason': reason_all[k, j].astype(np.int8),
+            }
+
+
+def holding_exits(close: np.array, trades, index: FirstPassageIndex = None):
+    """
+    Bougie de sortie de chaque trade quand la sortie n'est testée qu'à partir
+    de entry_i + 1 (walk-forward : sortie testée avant l'entrée).
+    Les trades encore ouverts sortent à len(close) (jamais atteint).
+    """
+    if len(trades) == 0:
+        return np.zeros(0, dtype=np.int64)
+    entry = trades['entry_i'].to_numpy().astype(np.int64)
+    exit_i, _, _ = _exits(close, index)(
+        entry + 1,
+        trades['tp'].to_numpy(), trades['sl'].to_numpy(),
+        trades['hp_i'].to_numpy().astype(np.int64)
+    )
+    return np.where(np.isnan(exit_i), len(close), exit_i).astype(np.int64)
+
+
+def label_matrix(close: np.array, trades: pd.DataFrame, configs: list,
+                 index: FirstPassageIndex = None):
+    """
+    Rendements / labels de chaque trade pour plusieurs configurations de
+    barrières [(tp_mult, sl_mult, hold_period), ...], sur les mêmes entrées.
+
+    TP / SL sont recalculés depuis entry_p et atr du trade (close en log,
+    comme dans les stratégies). Chaque entrée est évaluée indépendamment :
+    les lignes restent alignées sur trades / data_x, quelle que soit la
+    configuration.
+
+    Retourne (returns, labels) : DataFrames indexés comme trades, une colonne
+    par configuration (MultiIndex tp_mult / sl_mult / hold_period).
+    returns vaut NaN pour un trade encore ouvert (label 0, comme data_y).
+    """
+    columns = pd.MultiIndex.from_tuples(
+        [tuple(c) for c in configs], names=['tp_mult', 'sl_mult', 'hold_period']
+    )
+    m, n_cfg = len(trades), len(configs)
+    if m == 0 or n_cfg == 0:
+        empty = pd.DataFrame(np.zeros((m, n_cfg)), index=trades.index, columns=columns)
+        return empty * np.nan, empty.astype(int)
+
+    tp_mult, sl_mult, hold = (np.array(v, dtype=float) for v in zip(*configs))
+
+    # Une ligne par (configuration, trade) → un seul passage du moteur
+    entry   = trades['entry_i'].to_numpy().astype(np.int64)
+    entry_p = trades['entry_p'].to_numpy()
+    atr     = trades['atr'].to_numpy()
+
+    start = np.tile(entry, n_cfg)
+    tp    = (entry_p + atr * tp_mult[:, None]).ravel()
+    sl    = (entry_p - atr * sl_mult[:, None]).ravel()
+    end   = (entry + hold[:, None].astype(np.int64)).ravel()
+    _, exit_p, _ = _exits(close, index)(start, tp, sl, end)
+
+    rets    = exit_p.reshape(n_cfg, m).T - entry_p[:, None]
+    returns = pd.DataFrame(rets, index=trades.index, columns=columns)
+    labels  = (returns > 0).astype(int)
+    return returns, labels
@@ -2,95 +2,106 @@ import numpy as np
 import pandas as pd
 import pandas_ta as ta
 import matplotlib.pyplot as plt
-import xgboost as xgb
 from base_strategy import Strategy
+from triple_barrier import holding_exits
+from walkforward_engine import run_walkforward_events
+from trade_index import TradeIndex
+from meta_model import make_meta_model, check_backend
+
+
+def score_fold(model, data_x: pd.DataFrame, entry_bars: np.array,
+               start_i: int, end_i: int, probs: np.array):
+    """
+    Remplit probs pour tous les trades entrés dans [start_i, end_i) avec un
+    seul predict_proba (au lieu d'un appel par trade). entry_bars est trié.
+    """
+    lo, hi = np.searchsorted(entry_bars, [start_i, end_i])
+    if model is not None and hi > lo:
+        probs[lo:hi] = model.predict_proba(data_x.iloc[lo:hi].to_numpy())[:, 1]
 
 
 def walkforward_model(
         close: np.array, trades: pd.DataFrame,
         data_x: pd.DataFrame, data_y: pd.Series,
-        train_size: int, step_size: int
+        train_size: int, step_size: int,
+        incremental: bool = False,   # Fenêtre expanding + warm start
+        add_rounds: int = 100,       # Arbres ajoutés à chaque fold incrémental
+        refresh_every: int = 4,      # Ré-entraînement complet tous les N folds
+        backend: str = 'xgboost',    # Méta-modèle : 'xgboost' | 'lightgbm' | 'histgb'
+        model_params: dict = None    # Surcharge des paramètres du méta-modèle
 ):
-    signal      = np.zeros(len(close))
-    dumb_signal = np.zeros(len(close))
-
-    next_train = train_size
-    trade_i    = 0
-
-    in_trade_ml   = False
-    in_trade_dumb = False
-
-    tp_price_ml   = sl_price_ml   = hp_i_ml   = None
-    tp_price_dumb = sl_price_dumb = hp_i_dumb = None
-
+    """
+    backend / model_params : cf. meta_model.make_meta_model.
+
+    incremental=True : la fenêtre d'entraînement part du début (expanding).
+    Entre deux ré-entraînements complets (tous les refresh_every folds,
+    None → jamais), chaque fold continue le booster du fold précédent avec
+    add_rounds arbres, sur les seuls trades clôturés depuis (reportés au
+    fold suivant tant qu'ils ne contiennent qu'une classe).
+    XGBoost / LightGBM uniquement (ValueError sinon).
+    """
+    check_backend(backend, incremental)
     last_model = None  # on garde le dernier modèle pour l'analyse
 
-    for i in range(len(close)):
-
-        # ── 1. Retraining ───────────────────────────────────────────────────
-        if i == next_train:
-            start_i = i - train_size
-            train_indices = trades[
-                (trades['entry_i'] > start_i) & (trades['exit_i'] < i)
-            ].index
+    # Bougies d'entrée / sortie de chaque trade, calculées d'avance
+    entry_bars = trades['entry_i'].to_numpy().astype(np.int64)
+    exit_bars  = holding_exits(close, trades)
+
+    # Probas calculées par fold, dès que le modèle du fold est connu
+    probs      = np.full(len(trades), np.nan, dtype=np.float32)
+
+    # Fenêtres d'entraînement par searchsorted (entrées / sorties triées)
+    trade_index = TradeIndex.from_trades(trades)
+
+    # Mode incrémental : folds depuis le dernier ré-entraînement complet
+    since_refresh = 0
+    trained_rows  = slice(0, 0)
+
+    # ── 1. Retraining ───────────────────────────────────────────────────────
+    def on_retrain(i):
+        nonlocal last_model, since_refresh, trained_rows
+        start_i = None if incremental else i - train_size
+        rows    = trade_index.window(start_i, i)
+
+        warm = incremental and last_model is not None and \
+            (refresh_every is None or since_refresh < refresh_every)
+
+        if warm:
+            # Warm start : seulement les trades clôturés depuis le fold précédent
+            new_indices = trades.index[trained_rows.stop:rows.stop]
+            y_new = data_y.loc[new_indices].to_numpy()
+            print(f'Warm start  i={i}  N nouveaux trades={len(new_indices)}')
+            # Lot d'une seule classe (petits pas) : modèle inchangé, les
+            # trades restent en attente pour le warm start suivant
+            if len(np.unique(y_new)) >= 2:
+                last_model = last_model.continue_fit(
+                    data_x.loc[new_indices].to_numpy(), y_new, add_rounds
+                )
+                trained_rows = rows
+            since_refresh += 1
+        else:
+            train_indices = trades.index[rows]
             x_train = data_x.loc[train_indices]
             y_train = data_y.loc[train_indices]
             print(f'Training  i={i}  N trades={len(train_indices)}')
-            last_model = xgb.XGBClassifier(
-                n_estimators=500,
-                max_depth=3,
-                learning_rate=0.05,
-                subsample=0.8,
-                colsample_bytree=0.8,
-                eval_metric='logloss',
-                random_state=42
-            )
+            last_model = make_meta_model(backend, **(model_params or {}))
             last_model.fit(x_train.to_numpy(), y_train.to_numpy())
-            next_train += step_size
-
-        # ── 2. Sortie trade ML ──────────────────────────────────────────────
-        if in_trade_ml:
-            if close[i] >= tp_price_ml or close[i] <= sl_price_ml or i >= hp_i_ml:
-                signal[i]   = 0
-                in_trade_ml = False
-            else:
-                signal[i] = 1
-
-        # ── 3. Sortie trade DUMB ────────────────────────────────────────────
-        if in_trade_dumb:
-            if close[i] >= tp_price_dumb or close[i] <= sl_price_dumb or i >= hp_i_dumb:
-                dumb_signal[i] = 0
-                in_trade_dumb  = False
-            else:
-                dumb_signal[i] = 1
-
-        # ── 4. Entrée potentielle ───────────────────────────────────────────
-        if trade_i < len(trades) and i == int(trades['entry_i'].iloc[trade_i]):
-
-            trade = trades.iloc[trade_i]
-
-            if last_model is not None and not in_trade_dumb:
-                dumb_signal[i] = 1
-                in_trade_dumb  = True
-                tp_price_dumb  = trade['tp']
-                sl_price_dumb  = trade['sl']
-                hp_i_dumb      = int(trade['hp_i'])
-
-            if last_model is not None and not in_trade_ml:
-                prob = last_model.predict_proba(
-                    data_x.iloc[trade_i].to_numpy().reshape(1, -1)
-                )[0][1]
-                trades.loc[trade_i, 'model_prob'] = prob
-
-                if prob > 0.5:
-                    signal[i]   = 1
-                    in_trade_ml = True
-                    tp_price_ml = trade['tp']
-                    sl_price_ml = trade['sl']
-                    hp_i_ml     = int(trade['hp_i'])
-
-            trade_i += 1
+            trained_rows = rows
+            since_refresh = 1
+
+        score_fold(last_model, data_x, entry_bars, i, i + step_size, probs)
+        return True
+
+    # ── 2. Sorties / entrées : file d'événements ────────────────────────────
+    signal, dumb_signal, checked = run_walkforward_events(
+        len(close), entry_bars, exit_bars,
+        range(train_size, len(close), step_size),
+        on_retrain,
+        accept=lambda k: probs[k] > 0.5
+    )
 
+    model_prob = np.where(checked, probs, np.float32(np.nan))
+    trades['model_prob'] = model_prob
     return signal, dumb_signal, last_model  # ← on retourne aussi le modèle
 
 
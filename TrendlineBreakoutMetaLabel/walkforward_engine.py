@@ -0,0 +1,89 @@
+"""
+walkforward_engine.py
+---------------------
+Cœur événementiel du walk-forward.
+
+L'état (modèle actif, position ML, position "dumb") ne change qu'aux
+retrainings, aux entrées et aux sorties de trades : au lieu de parcourir
+chaque bougie, on dépile une file d'événements triée par (bougie, priorité).
+À bougie égale, l'ordre est celui des boucles d'origine :
+  retraining → sortie ML → sortie dumb → entrée
+
+Les signaux sont remplis ensuite par plages [entrée, sortie) en une passe
+vectorisée → O(trades + folds) en Python au lieu de O(bougies).
+"""
+
+import heapq
+import numpy as np
+
+# Priorités à bougie égale
+RETRAIN   = 0
+EXIT_ML   = 1
+EXIT_DUMB = 2
+ENTRY     = 3
+
+
+def fill_positions(n_bars: int, starts: list, ends: list) -> np.array:
+    """Signal 1 sur [start, end) pour chaque position (end = n_bars → ouverte)."""
+    delta = np.zeros(n_bars + 1)
+    np.add.at(delta, np.asarray(starts, dtype=np.int64), 1.0)
+    np.add.at(delta, np.asarray(ends, dtype=np.int64), -1.0)
+    return (np.cumsum(delta[:n_bars]) > 0).astype(float)
+
+
+def run_walkforward_events(n_bars: int, entry_bars: np.array, exit_bars: np.array,
+                           retrain_bars, on_retrain, accept):
+    """
+    n_bars       : nombre de bougies de la paire évaluée
+    entry_bars   : bougie d'entrée de chaque trade (triée)
+    exit_bars    : bougie de sortie de chaque trade (holding_exits, n_bars si ouvert)
+    retrain_bars : bougies de retraining
+    on_retrain(i) → bool : entraîne / active le modèle du fold i et retourne
+                           True si un modèle est disponible
+    accept(k)     → bool : décision du filtre ML pour le trade k
+
+    Retourne (signal, dumb_signal, checked) ; checked marque les trades
+    soumis au modèle (modèle disponible et aucune position ML ouverte).
+    """
+    events = [(int(i), RETRAIN, -1) for i in retrain_bars if i < n_bars]
+    events += [(int(i), ENTRY, k) for k, i in enumerate(entry_bars) if i < n_bars]
+    heapq.heapify(events)
+
+    checked   = np.zeros(len(entry_bars), dtype=bool)
+    ml_pos    = ([], [])     # (starts, ends)
+    dumb_pos  = ([], [])
+    has_model = False
+    in_ml = in_dumb = False
+
+    while events:
+        i, kind, k = heapq.heappop(events)
+
+        if kind == RETRAIN:
+            has_model = on_retrain(i)
+
+        elif kind == EXIT_ML:
+            in_ml = False
+
+        elif kind == EXIT_DUMB:
+            in_dumb = False
+
+        elif has_model:
+            exit_i = int(exit_bars[k])
+
+            if not in_dumb:
+                in_dumb = True
+                dumb_pos[0].append(i); dumb_pos[1].append(exit_i)
+                if exit_i < n_bars:
+                    heapq.heappush(events, (exit_i, EXIT_DUMB, k))
+
+            if not in_ml:
+                checked[k] = True
+                if accept(k):
+                    in_ml = True
+                    ml_pos[0].append(i); ml_pos[1].append(exit_i)
+                    if exit_i < n_bars:
+                        heapq.heappush(events, (exit_i, EXIT_ML, k))
+
+    signal      = fill_positions(n_bars, *ml_pos)
+    dumb_signal = fill_positions(n_bars, *dumb_pos)
+    return signal, dumb_signal, checked
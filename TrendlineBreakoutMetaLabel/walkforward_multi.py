@@ -11,9 +11,17 @@ import numpy as np
 import pandas as pd
 import pandas_ta as ta
 import matplotlib.pyplot as plt
-import xgboost as xgb
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from base_strategy import Strategy
+from triple_barrier import holding_exits
+from walkforward import score_fold
+from walkforward_engine import run_walkforward_events
+from trade_index import TradeIndex
+from meta_model import make_meta_model, check_backend
+from results_store import ResultsStore
+from threshold_curve import select_threshold
 
 
 def load_pair(filepath: str) -> pd.DataFrame:
@@ -27,17 +35,289 @@ def load_pair(filepath: str) -> pd.DataFrame:
     return data.dropna()
 
 
+def _n_rows(r) -> int:
+    return r.stop - r.start if isinstance(r, slice) else len(r)
+
+
+def stack_rows(all_data_x: dict, all_data_y: dict, rows: dict):
+    """Concatène les lignes {paire: slice ou indices} de toutes les paires → (X, Y), ou None si vide."""
+    combined_x = [all_data_x[name].iloc[r] for name, r in rows.items() if _n_rows(r) > 0]
+    combined_y = [all_data_y[name].iloc[r] for name, r in rows.items() if _n_rows(r) > 0]
+    if not combined_x:
+        return None
+    return pd.concat(combined_x).to_numpy(), pd.concat(combined_y).to_numpy()
+
+
+def train_fold_model(trade_index: dict, all_data_x: dict, all_data_y: dict,
+                     start, end, n_jobs: int = None,
+                     backend: str = 'xgboost', model_params: dict = None):
+    """
+    Entraîne le modèle d'un fold sur les trades de toutes les paires
+    ouverts après start et clôturés avant end (bougies ou horodatages,
+    selon le repère des TradeIndex).
+    Retourne None si la fenêtre ne contient aucun trade.
+    n_jobs : threads du méta-modèle (None → défaut du backend).
+    """
+    # Trades de la fenêtre : plage contiguë trouvée par searchsorted
+    rows = {name: index.window(start, end) for name, index in trade_index.items()}
+    stacked = stack_rows(all_data_x, all_data_y, rows)
+    if stacked is None:
+        return None
+
+    X, Y = stacked
+    print(f"  Training i={end}  N={len(X)} trades "
+          f"({', '.join(trade_index.keys())})")
+    model = make_meta_model(backend, n_jobs, **(model_params or {}))
+    model.fit(X, Y)
+    return model
+
+
+def train_incremental_folds(trade_index: dict, all_data_x: dict, all_data_y: dict,
+                            ends: list, add_rounds: int = 100, refresh_every: int = 4,
+                            backend: str = 'xgboost', model_params: dict = None):
+    """
+    Folds en fenêtre expanding (tous les trades clôturés avant end), dans
+    l'ordre : entre deux ré-entraînements complets (tous les refresh_every
+    folds, None → jamais), chaque fold continue le booster du précédent
+    avec add_rounds arbres sur les seuls trades clôturés depuis (reportés
+    au fold suivant tant qu'ils ne contiennent qu'une classe).
+    Retourne {(None, end): modèle ou None}.
+    """
+    models = {}
+    model = None
+    since_refresh = 0
+    trained = {name: slice(0, 0) for name in trade_index}
+
+    for end in ends:
+        rows = {name: index.window(None, end) for name, index in trade_index.items()}
+
+        if model is not None and (refresh_every is None or since_refresh < refresh_every):
+            new_rows = {name: slice(trained[name].stop, r.stop) for name, r in rows.items()}
+            stacked  = stack_rows(all_data_x, all_data_y, new_rows)
+            # Lot d'une seule classe (petits pas) : modèle inchangé, les
+            # trades restent en attente pour le warm start suivant
+            if stacked is not None and len(np.unique(stacked[1])) >= 2:
+                print(f"  Warm start i={end}  N={len(stacked[0])} nouveaux trades")
+                model = model.continue_fit(*stacked, add_rounds)
+                trained = rows
+            since_refresh += 1
+        else:
+            model = train_fold_model(trade_index, all_data_x, all_data_y, None, end,
+                                     backend=backend, model_params=model_params)
+            trained = rows
+            since_refresh = 1
+
+        models[(None, end)] = model
+    return models
+
+
+def oof_probabilities(trade_index: dict, all_data_x: dict, all_data_y: dict, rows: dict,
+                      inner_splits: int = 3, embargo: float = 0.01, n_jobs: int = None,
+                      backend: str = 'xgboost', model_params: dict = None) -> dict:
+    """
+    Probas out-of-fold des trades {paire: slice} d'une fenêtre d'entraînement.
+    La fenêtre est découpée en inner_splits blocs sur le repère des
+    TradeIndex (bougies ou temps), communs à toutes les paires ; le bloc j
+    est prédit par un modèle entraîné sur les autres blocs, purgés :
+      - des trades dont l'intervalle [entrée, sortie] chevauche le bloc j
+        (entrée jusqu'à la dernière sortie de ses trades)
+      - des trades entrés moins de embargo × (durée de la fenêtre) après lui
+    Retourne {paire: probas} (NaN si non prédit).
+    """
+    entry = {name: trade_index[name].entry_keys[r] for name, r in rows.items()}
+    exit_ = {name: trade_index[name].exit_keys[r] for name, r in rows.items()}
+    oof   = {name: np.full(_n_rows(r), np.nan) for name, r in rows.items()}
+
+    all_entries = np.sort(np.concatenate(list(entry.values()) or [np.zeros(0, np.int64)]))
+    if len(all_entries) == 0:
+        return oof
+
+    # Bornes des blocs : même nombre de trades (toutes paires) par bloc
+    last   = np.iinfo(np.int64).max
+    edges  = [int(b[0]) for b in np.array_split(all_entries, inner_splits) if len(b)] + [last]
+    span   = max(int(e.max()) for e in exit_.values() if len(e)) - edges[0]
+    gap    = int(embargo * span)
+
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        test = {name: np.flatnonzero((e >= lo) & (e < hi)) for name, e in entry.items()}
+        if not any(len(k) for k in test.values()):
+            continue
+        # Reprise après la dernière sortie du bloc + embargo
+        end    = max(int(exit_[name][k].max()) for name, k in test.items() if len(k))
+        resume = max(hi, end + 1) + gap if hi < last else last
+        train  = {name: np.flatnonzero((exit_[name] < lo) | (e >= resume)) + rows[name].start
+                  for name, e in entry.items()}
+        stacked = stack_rows(all_data_x, all_data_y, train)
+        if stacked is None or len(np.unique(stacked[1])) < 2:
+            continue
+        model = make_meta_model(backend, n_jobs, **(model_params or {}))
+        model.fit(*stacked)
+        for name, k in test.items():
+            if len(k):
+                x = all_data_x[name].iloc[k + rows[name].start].to_numpy()
+                oof[name][k] = model.predict_proba(x)[:, 1]
+    return oof
+
+
+def calibrate_fold_thresholds(trade_index: dict, all_data_x: dict, all_data_y: dict,
+                              all_returns: dict, start, end, inner_splits: int = 3,
+                              n_jobs: int = None, backend: str = 'xgboost',
+                              model_params: dict = None, embargo: float = 0.01) -> dict:
+    """
+    Seuil ML de chaque paire pour le fold (start, end), choisi sur les
+    probas out-of-fold (purgées, cf. oof_probabilities) de sa fenêtre
+    d'entraînement (cf. select_threshold).
+    Retourne {paire: seuil} ; une paire sans seuil éligible est absente.
+    """
+    rows = {name: index.window(start, end) for name, index in trade_index.items()}
+    oof  = oof_probabilities(trade_index, all_data_x, all_data_y, rows, inner_splits,
+                             embargo, n_jobs, backend, model_params)
+    fold_thresholds = {}
+    for name, r in rows.items():
+        thresh = select_threshold(oof[name], all_returns[name][r])
+        if thresh is not None:
+            fold_thresholds[name] = thresh
+    return fold_thresholds
+
+
+# Datasets partagés avec les workers d'entraînement (envoyés une fois par processus)
+_datasets = None
+
+
+def _attach_datasets(trade_index: dict, all_data_x: dict, all_data_y: dict):
+    global _datasets
+    _datasets = (trade_index, all_data_x, all_data_y)
+
+
+def _train_fold_task(window: tuple, model_jobs: int, backend: str, model_params: dict):
+    return window, train_fold_model(*_datasets, *window, n_jobs=model_jobs,
+                                    backend=backend, model_params=model_params)
+
+
+def train_fold_models_parallel(trade_index: dict, all_data_x: dict, all_data_y: dict,
+                               windows: list, n_jobs: int = None,
+                               backend: str = 'xgboost', model_params: dict = None):
+    """
+    Entraîne tous les folds d'avance dans un pool de processus
+    (n_jobs=None → tous les cœurs). Les threads du méta-modèle de chaque
+    worker sont répartis entre les processus pour ne pas sursouscrire les cœurs.
+    Retourne {(start, end): modèle ou None}, dans l'ordre des folds.
+    """
+    n_cpu  = os.cpu_count() or 1
+    n_jobs = n_cpu if n_jobs is None or n_jobs < 1 else n_jobs
+    n_jobs = max(1, min(n_jobs, len(windows)))
+    model_jobs = max(1, n_cpu // n_jobs)
+
+    # Pas de fork : la calibration des seuils (nested_thresholds) tourne déjà
+    # dans un thread (import de XGBoost, threads OpenMP) ; un enfant forké
+    # hériterait de verrous tenus par ce thread et bloquerait indéfiniment
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context, initializer=_attach_datasets,
+                             initargs=(trade_index, all_data_x, all_data_y)) as pool:
+        futures = [pool.submit(_train_fold_task, w, model_jobs, backend, model_params)
+                   for w in windows]
+        return dict(fut.result() for fut in futures)
+
+
+def fold_schedule(index: pd.DatetimeIndex, train_size: int, step_size: int,
+                  calendar: pd.DatetimeIndex = None):
+    """
+    Retrainings d'une paire : [(bougie, (start, end))].
+
+    calendar=None : repère bougies, fenêtre (i - train_size, i) en bougies
+                    de la paire (entry_i comme proxy temporel).
+    calendar      : repère temps. Les folds sont placés sur le calendrier
+                    commun (union des dates de toutes les paires) et la
+                    paire se réentraîne à sa première bougie >= fin du fold.
+                    Plusieurs folds sur la même bougie (paire cotée plus
+                    tard) → seul le plus récent est gardé.
+    """
+    if calendar is None:
+        return [(i, (i - train_size, i)) for i in range(train_size, len(index), step_size)]
+
+    ends = np.arange(train_size, len(calendar), step_size)
+    bars = np.searchsorted(index.values, calendar.values[ends], side='left')
+    schedule = {}
+    for bar, k in zip(bars, ends):
+        if bar < len(index):
+            schedule[int(bar)] = (calendar[k - train_size], calendar[k])
+    return list(schedule.items())
+
+
 def walkforward_multi(
         pairs_data: dict,          # {'BTC': df, 'ETH': df, 'SOL': df}
         strategy: Strategy,        # Instance de la stratégie à backtester
         train_size: int = 365*24*2,
         step_size: int  = 365*24,
-        thresholds: dict = None    # Seuils ML optimisés par paire
+        thresholds: dict = None,   # Seuils ML optimisés par paire
+        n_jobs: int = 1,           # Processus d'entraînement des folds (None → tous)
+        align: str = 'bars',       # Fenêtres en bougies ('bars') ou en dates ('time')
+        incremental: bool = False, # Fenêtre expanding + warm start
+        add_rounds: int = 100,     # Arbres ajoutés à chaque fold incrémental
+        refresh_every: int = 4,    # Ré-entraînement complet tous les N folds
+        backend: str = 'xgboost',  # Méta-modèle : 'xgboost' | 'lightgbm' | 'histgb'
+        model_params: dict = None, # Surcharge des paramètres du méta-modèle
+        nested_thresholds: bool = False, # Seuil ML choisi par fold (out-of-fold)
+        inner_splits: int = 3,     # Blocs de la validation croisée interne
+        store_dir: str = None      # Stockage disque des résultats (None → désactivé)
 ):
     """
     Entraîne sur toutes les paires combinées.
     Évalue sur chaque paire séparément.
+    Chaque fold n'est entraîné qu'une fois ; results[pair]['fold_models']
+    donne {fin du fold: modèle} des folds utilisés par la paire.
+    Avec n_jobs != 1, tous les folds sont entraînés d'avance en parallèle
+    (mêmes modèles qu'en série).
+
+    align='bars' : fenêtre (i - train_size, i) en bougies, entry_i servant
+                   de proxy temporel entre paires (comportement historique).
+    align='time' : fenêtres en dates réelles sur le calendrier commun des
+                   paires → correct pour des paires cotées à des dates
+                   différentes. train_size / step_size restent en bougies
+                   de ce calendrier.
+
+    incremental=True : fenêtres expanding entraînées dans l'ordre des folds,
+                   warm start entre deux ré-entraînements complets
+                   (cf. train_incremental_folds ; n_jobs est alors ignoré).
+                   XGBoost / LightGBM uniquement (ValueError sinon).
+
+    backend / model_params : cf. meta_model.make_meta_model.
+
+    nested_thresholds=True : chaque fold choisit le seuil ML de chaque paire
+                   sur les probas out-of-fold de sa propre fenêtre
+                   d'entraînement (inner_splits blocs), et l'applique
+                   jusqu'au retraining suivant. Les calibrations tournent
+                   dans un thread en parallèle de l'entraînement des folds.
+                   thresholds ne sert plus que de repli ; le seuil appliqué
+                   à chaque trade est dans trades['threshold'] et
+                   results[pair]['fold_thresholds'] donne {fin du fold: seuil}.
+
+    store_dir : résultats relus depuis results_store s'ils existent pour
+                ces données / cette stratégie / ces paramètres, écrits sinon
+                (signaux int8 en memory-map au lieu de float).
     """
+    if align not in ('bars', 'time'):
+        raise ValueError(f"Unknown align '{align}' (expected 'bars' or 'time')")
+    check_backend(backend, incremental)
+    by_time = align == 'time'
+
+    # ── 0. Résultats déjà calculés ? ─────────────────────────────────────────
+    store = store_key = store_params = None
+    if store_dir is not None:
+        store = ResultsStore(store_dir)
+        store_params = dict(
+            train_size=train_size, step_size=step_size, thresholds=thresholds,
+            align=align, incremental=incremental, add_rounds=add_rounds,
+            refresh_every=refresh_every, backend=backend, model_params=model_params,
+            nested_thresholds=nested_thresholds, inner_splits=inner_splits
+        )
+        store_key = store.key(pairs_data, strategy, store_params)
+        results = store.get(store_key, pairs_data)
+        if results is not None:
+            print(f"Résultats chargés depuis {store.path(store_key)}")
+            return results
 
     # ── 1. Générer le dataset pour chaque paire ──────────────────────────────
     print("Génération des datasets...")
@@ -53,115 +333,167 @@ def walkforward_multi(
         all_data_y[name] = data_y
         print(f"     {len(trades)} trades détectés")
 
-    # ── 2. Walk-forward sur chaque paire ─────────────────────────────────────
-    results = {}
-
-    for eval_name, eval_df in pairs_data.items():
-        print(f"\nWalk-forward sur {eval_name}...")
-
-        close      = np.log(eval_df['close'].to_numpy())
-        trades     = all_trades[eval_name].copy()
-        data_x     = all_data_x[eval_name]
-        data_y     = all_data_y[eval_name]
-
-        signal      = np.zeros(len(close))
-        dumb_signal = np.zeros(len(close))
-
-        next_train    = train_size
-        trade_i       = 0
-        in_trade_ml   = False
-        in_trade_dumb = False
-        tp_ml = sl_ml = hp_ml = None
-        tp_du = sl_du = hp_du = None
-        last_model    = None
-
-        for i in range(len(close)):
-
-            # Retraining : combine TOUTES les paires disponibles jusqu'à i
-            if i == next_train:
-                start_i = i - train_size
-                combined_x = []
-                combined_y = []
-
-                for src_name in pairs_data:
-                    src_trades = all_trades[src_name]
-                    src_x      = all_data_x[src_name]
-                    src_y      = all_data_y[src_name]
-
-                    # On prend les trades dans la fenêtre temporelle
-                    # Note : on utilise entry_i comme proxy temporel
-                    # (approximation — idéalement aligner les timestamps)
-                    idx = src_trades[
-                        (src_trades['entry_i'] > start_i) &
-                        (src_trades['exit_i']  < i)
-                    ].index
-                    if len(idx) > 0:
-                        combined_x.append(src_x.loc[idx])
-                        combined_y.append(src_y.loc[idx])
-
-                if combined_x:
-                    X = pd.concat(combined_x)
-                    Y = pd.concat(combined_y)
-                    print(f"  Training i={i}  N={len(X)} trades "
-                          f"({', '.join(pairs_data.keys())})")
-                    last_model = xgb.XGBClassifier(
-                        n_estimators=500, max_depth=3,
-                        learning_rate=0.05, subsample=0.8,
-                        colsample_bytree=0.8, eval_metric='logloss',
-                        random_state=42
-                    )
-                    last_model.fit(X.to_numpy(), Y.to_numpy())
-
-                next_train += step_size
-
-            # Sortie ML
-            if in_trade_ml:
-                if close[i] >= tp_ml or close[i] <= sl_ml or i >= hp_ml:
-                    signal[i] = 0; in_trade_ml = False
-                else:
-                    signal[i] = 1
-
-            # Sortie DUMB
-            if in_trade_dumb:
-                if close[i] >= tp_du or close[i] <= sl_du or i >= hp_du:
-                    dumb_signal[i] = 0; in_trade_dumb = False
-                else:
-                    dumb_signal[i] = 1
-
-            # Entrée
-            if trade_i < len(trades) and i == int(trades['entry_i'].iloc[trade_i]):
-                trade = trades.iloc[trade_i]
-
-                if last_model is not None and not in_trade_dumb:
-                    dumb_signal[i] = 1; in_trade_dumb = True
-                    tp_du = trade['tp']; sl_du = trade['sl']
-                    hp_du = int(trade['hp_i'])
-
-                if last_model is not None and not in_trade_ml:
-                    prob = last_model.predict_proba(
-                        data_x.iloc[trade_i].to_numpy().reshape(1, -1)
-                    )[0][1]
-                    trades.loc[trade_i, 'model_prob'] = prob
-                    
-                    # Sélection du seuil spécifique à la paire, 0.5 par défaut
-                    thresh = thresholds.get(eval_name, 0.5) if thresholds else 0.5
-                    if prob >= thresh:
-                        signal[i] = 1; in_trade_ml = True
-                        tp_ml = trade['tp']; sl_ml = trade['sl']
-                        hp_ml = int(trade['hp_i'])
-
-                trade_i += 1
-
-        results[eval_name] = {
-            'signal': signal,
-            'dumb_signal': dumb_signal,
-            'trades': trades,
-            'data_x': data_x,
-            'close': close,
-            'df': eval_df,
-            'model': last_model
+    # ── 2. Index des trades et calendrier des folds ─────────────────────────
+    trade_index = {
+        name: TradeIndex.from_trades(all_trades[name],
+                                     pairs_data[name].index if by_time else None)
+        for name in pairs_data
+    }
+
+    calendar = None
+    if by_time:
+        calendar = pd.DatetimeIndex(np.unique(np.concatenate(
+            [df.index.values for df in pairs_data.values()]
+        )))
+    schedules = {
+        name: fold_schedule(df.index, train_size, step_size, calendar)
+        for name, df in pairs_data.items()
+    }
+
+    # ── Registre des modèles par fold ────────────────────────────────────────
+    # La fenêtre d'entraînement ne dépend que de (start, end) (trades de TOUTES
+    # les paires) → chaque fold est entraîné une seule fois, puis réutilisé
+    # par toutes les paires évaluées.
+    fold_models = {}
+
+    if incremental:
+        # Fenêtre expanding : seule la fin du fold compte
+        schedules = {
+            name: [(bar, (None, end)) for bar, (_, end) in schedule]
+            for name, schedule in schedules.items()
         }
 
+    windows = sorted(
+        dict.fromkeys(w for schedule in schedules.values() for _, w in schedule),
+        key=lambda w: w[1]
+    )
+
+    # Calibration des seuils : un thread, en parallèle de l'entraînement.
+    # Ses modèles internes se partagent les cœurs avec ceux des folds :
+    # 1 thread si les folds occupent déjà tous les cœurs, la moitié sinon
+    fold_thresholds = {}
+    calibration = None
+    if nested_thresholds:
+        n_cpu = os.cpu_count() or 1
+        calib_jobs = 1 if n_jobs != 1 and not incremental else max(1, n_cpu // 2)
+        all_returns = {name: trades['return'].to_numpy() for name, trades in all_trades.items()}
+        calibration = ThreadPoolExecutor(max_workers=1)
+
+    try:
+        if calibration is not None:
+            fold_thresholds = {
+                w: calibration.submit(calibrate_fold_thresholds, trade_index, all_data_x,
+                                      all_data_y, all_returns, *w, inner_splits,
+                                      calib_jobs, backend, model_params)
+                for w in windows
+            }
+
+        if incremental:
+            print(f"Entraînement incrémental de {len(windows)} folds...")
+            fold_models = train_incremental_folds(
+                trade_index, all_data_x, all_data_y, [end for _, end in windows],
+                add_rounds, refresh_every, backend, model_params
+            )
+        elif n_jobs != 1:
+            print(f"Entraînement parallèle de {len(windows)} folds...")
+            if windows:
+                fold_models = train_fold_models_parallel(
+                    trade_index, all_data_x, all_data_y, windows, n_jobs,
+                    backend, model_params
+                )
+
+        def fold_model(window):
+            if window not in fold_models:
+                fold_models[window] = train_fold_model(
+                    trade_index, all_data_x, all_data_y, *window,
+                    backend=backend, model_params=model_params
+                )
+            return fold_models[window]
+
+        # ── 3. Walk-forward sur chaque paire ─────────────────────────────────
+        results = {}
+
+        for eval_name, eval_df in pairs_data.items():
+            print(f"\nWalk-forward sur {eval_name}...")
+
+            close      = np.log(eval_df['close'].to_numpy())
+            trades     = all_trades[eval_name].copy()
+            data_x     = all_data_x[eval_name]
+            data_y     = all_data_y[eval_name]
+
+            last_model    = None
+            pair_folds    = {}     # {fin du fold: modèle} des folds utilisés par la paire
+
+            # Bougies d'entrée / sortie de chaque trade, calculées d'avance
+            entry_bars    = trades['entry_i'].to_numpy().astype(np.int64)
+            exit_bars     = holding_exits(close, trades)
+
+            # Probas calculées par fold, en un seul appel par modèle
+            probs         = np.full(len(trades), np.nan, dtype=np.float32)
+
+            # Sélection du seuil spécifique à la paire, 0.5 par défaut
+            default_thresh = thresholds.get(eval_name, 0.5) if thresholds else 0.5
+            thresh         = default_thresh
+            pair_thresh    = {}    # {fin du fold: seuil} (nested_thresholds)
+            trade_thresh   = np.full(len(trades), np.nan)
+
+            # Retraining : modèle du fold (toutes paires combinées), partagé.
+            # Le modèle score les trades jusqu'au retraining suivant.
+            schedule   = schedules[eval_name]
+            retrain_at = [bar for bar, _ in schedule]
+            windows    = dict(schedule)
+            score_end  = dict(zip(retrain_at, retrain_at[1:] + [len(close)]))
+
+            def on_retrain(i):
+                nonlocal last_model, thresh
+                window = windows[i]
+                model  = fold_model(window)
+                if model is not None:
+                    last_model = model
+                    pair_folds[window[1]] = model
+                    if nested_thresholds:
+                        thresh = fold_thresholds[window].result().get(eval_name, default_thresh)
+                        pair_thresh[window[1]] = thresh
+                score_fold(last_model, data_x, entry_bars, i, score_end[i], probs)
+                return last_model is not None
+
+            def accept(k):
+                trade_thresh[k] = thresh
+                return probs[k] >= thresh
+
+            signal, dumb_signal, checked = run_walkforward_events(
+                len(close), entry_bars, exit_bars,
+                retrain_at,
+                on_retrain,
+                accept
+            )
+
+            model_prob = np.where(checked, probs, np.float32(np.nan))
+            trades['model_prob'] = model_prob
+            if nested_thresholds:
+                trades['threshold'] = trade_thresh
+
+            results[eval_name] = {
+                'signal': signal,
+                'dumb_signal': dumb_signal,
+                'trades': trades,
+                'data_x': data_x,
+                'close': close,
+                'df': eval_df,
+                'model': last_model,
+                'fold_models': pair_folds
+            }
+            if nested_thresholds:
+                results[eval_name]['fold_thresholds'] = pair_thresh
+    finally:
+        # Y compris sur erreur : calibrations en file annulées, pas de thread orphelin
+        if calibration is not None:
+            calibration.shutdown(cancel_futures=True)
+
+    if store is not None:
+        store.put(store_key, results, store_params)
+        print(f"Résultats sauvegardés dans {store.path(store_key)}")
+
     return results
 
 
@@ -20,6 +20,12 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 from walkforward_multi import load_pair, walkforward_multi
+from results_store import DEFAULT_STORE_DIR
+
+# Seuil ML choisi par fold sur ses propres probas out-of-fold
+# (walkforward_multi nested_thresholds) ; THRESHOLDS ne sert que de repli.
+NESTED_THRESHOLDS = True
+
 # ── Frais par paire (aller-retour complet) ───────────────────────────────────
 FEES = {
     'BTC': {
@@ -61,13 +67,19 @@ def apply_fees(trades: pd.DataFrame, pair: str) -> pd.DataFrame:
     return trades
 
 
-def summary(trades_raw, trades_fees, name, threshold=0.5):
-    """Affiche les stats avant et après frais."""
+def summary(trades_raw, trades_fees, name, threshold=0.5, label=None):
+    """
+    Affiche les stats avant et après frais.
+    threshold : seuil unique, ou Series par trade (trades['threshold'],
+    nested_thresholds) ; label : texte du seuil affiché.
+    """
+    label = threshold if label is None else label
 
     def stats(t, label):
         t = t.dropna(subset=['model_prob'])
+        thr   = threshold.loc[t.index] if isinstance(threshold, pd.Series) else threshold
         all_r = t['return']
-        ml_r  = t[t['model_prob'] >= threshold]['return']
+        ml_r  = t[t['model_prob'] >= thr]['return']
 
         wins_all  = all_r[all_r > 0].sum()
         loses_all = all_r[all_r < 0].abs().sum()
@@ -91,7 +103,7 @@ def summary(trades_raw, trades_fees, name, threshold=0.5):
     swap   = f.get('overnight_pct', 0) * 100
 
     print(f"\n{'='*60}")
-    print(f"  {name} — Impact des frais (Seuil ML: {threshold})")
+    print(f"  {name} — Impact des frais (Seuil ML: {label})")
     print(f"  Spread : {spread:.2f}%  |  Swap/nuit : {swap:.3f}%")
     print(f"{'='*60}")
     print(f"  {'':20} {'SANS ML':>10} {'AVEC ML':>10}")
@@ -130,21 +142,25 @@ if __name__ == '__main__':
     print(f"Paires : {list(pairs_data.keys())}")
 
     # ── Walk-forward ─────────────────────────────────────────────────────────
-    # Seuils ML optimisés par script
+    # Seuils ML optimisés par script (repli si NESTED_THRESHOLDS)
     THRESHOLDS = {
         'BTC': 0.52,
         'ETH': 0.38,
         'SOL': 0.64
     }
 
+    from strategies.trendline_strategy import TrendlineBreakoutStrategy
+    strategy_instance = TrendlineBreakoutStrategy(lookback=72, hold_period=24)
+
     print("\nCalcul du walk-forward avec probabilités optimisées...")
     results = walkforward_multi(
         pairs_data,
-        lookback    = 72,
-        hold_period = 24,
+        strategy    = strategy_instance,
         train_size  = 365 * 24 * 2,
         step_size   = 365 * 24,
-        thresholds  = THRESHOLDS
+        thresholds  = THRESHOLDS,
+        nested_thresholds = NESTED_THRESHOLDS,
+        store_dir   = DEFAULT_STORE_DIR
     )
 
     # ── Appliquer les frais et comparer ──────────────────────────────────────
@@ -155,8 +171,13 @@ if __name__ == '__main__':
         trades_raw  = res['trades'].copy()
         trades_fees = apply_fees(trades_raw, name)
 
-        thresh = THRESHOLDS.get(name, 0.5)
-        verdicts[name] = summary(trades_raw, trades_fees, name, threshold=thresh)
+        if NESTED_THRESHOLDS:
+            thresh = trades_raw['threshold']
+            label  = f"par fold {sorted(set(res['fold_thresholds'].values()))}"
+        else:
+            thresh = THRESHOLDS.get(name, 0.5)
+            label  = thresh
+        verdicts[name] = summary(trades_raw, trades_fees, name, threshold=thresh, label=label)
 
         # Préparer données pour le graphique
         df = res['df'].copy()